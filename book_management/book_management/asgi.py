@@ -9,8 +9,56 @@ https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIHandler
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'book_management.settings')
 
-application = get_asgi_application()
+_EXHAUSTED = object()
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGIHandler que lee las respuestas en streaming fuera del event loop.
+
+    Django 4.1 recorre el iterador de un StreamingHttpResponse directamente en
+    el loop: en /api/books/export/ cada lote del cursor de pymongo bloquearía
+    al resto de peticiones del worker. Aquí cada parte se pide en un hilo.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': self._response_headers(response),
+        })
+        # Fuera del hilo único de las vistas síncronas: un export largo no las retiene
+        next_part = sync_to_async(next, thread_sensitive=False)
+        # Se accede a `__iter__` y no a `streaming_content`, como en Django
+        parts = iter(response)
+        while (part := await next_part(parts, _EXHAUSTED)) is not _EXHAUSTED:
+            for chunk, _ in self.chunk_bytes(part):
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+    @staticmethod
+    def _response_headers(response):
+        headers = [
+            (
+                header.encode('ascii') if isinstance(header, str) else header,
+                value.encode('latin1') if isinstance(value, str) else value,
+            )
+            for header, value in response.items()
+        ]
+        for cookie in response.cookies.values():
+            headers.append((b'Set-Cookie', cookie.output(header='').encode('ascii').strip()))
+        return headers
+
+
+django.setup(set_prefix=False)
+application = StreamingASGIHandler()
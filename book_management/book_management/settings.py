@@ -37,7 +37,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "books.middleware.AsyncWhiteNoiseMiddleware",
+    "books.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -66,17 +67,32 @@ TEMPLATES = [
 
 PORT = os.getenv('PORT', '8000')
 
+MONGODB_URI = os.getenv("MONGODB_URI")
+MONGODB_NAME = os.getenv("MONGODB_NAME", "book_management")
+MONGODB_TLS = os.getenv("MONGODB_TLS", "False") == "True"  # False para Railway
+
+# Un solo pool por proceso, compartido por djongo y el acceso directo (books.utils.mongo_connection)
+MONGODB_CLIENT_OPTIONS = {
+    "tls": MONGODB_TLS,
+    "tlsAllowInvalidCertificates": os.getenv("MONGODB_TLS_ALLOW_INVALID_CERTIFICATES", "True") == "True",
+    "retryWrites": True,
+    "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", "50")),
+    "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", "0")),
+    "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "300000")),
+    "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "30000")),
+    "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "30000")),
+    "socketTimeoutMS": int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "0")) or None,
+}
+
 DATABASES = {
     "default": {
-        "ENGINE": "djongo",
-        "NAME": os.getenv("MONGODB_NAME", "book_management"),
+        "ENGINE": "books.db",
+        "NAME": MONGODB_NAME,
         "ENFORCE_SCHEMA": False,
         "CLIENT": {
-            "host": os.getenv("MONGODB_URI"),
-            "ssl": False,  # Cambiar a False para Railway
-            "tlsAllowInvalidCertificates": True,
-            "serverSelectionTimeoutMS": 30000,
-            "connectTimeoutMS": 30000,
+            "host": MONGODB_URI,
+            **MONGODB_CLIENT_OPTIONS,
         },
     }
 }
@@ -84,20 +100,74 @@ DATABASES = {
 if not os.path.exists(os.path.join(BASE_DIR, "static")):
     os.makedirs(os.path.join(BASE_DIR, "static"))
 
+# JWT sin consulta del usuario por petición: confía en los claims firmados (ver books.authentication.ClaimsUser)
+BOOKS_STATELESS_JWT = os.getenv("BOOKS_STATELESS_JWT", "False") == "True"
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "rest_framework_simplejwt.authentication.JWTStatelessUserAuthentication"
+        if BOOKS_STATELESS_JWT
+        else "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "books.authentication.CachedTokenAuthentication",
         "rest_framework.authentication.SessionAuthentication",
         "rest_framework.authentication.BasicAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
+    # orjson por defecto; MessagePack con Accept / Content-Type: application/msgpack
+    "DEFAULT_RENDERER_CLASSES": [
+        "books.renderers.ORJSONRenderer",
+        "books.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "books.renderers.ORJSONParser",
+        "books.renderers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
 
+BOOKS_PAGE_SIZE = int(os.getenv("BOOKS_PAGE_SIZE", "10"))
+BOOKS_MAX_PAGE_SIZE = int(os.getenv("BOOKS_MAX_PAGE_SIZE", "100"))
+BOOKS_EXPORT_BATCH_SIZE = int(os.getenv("BOOKS_EXPORT_BATCH_SIZE", "1000"))
+BOOKS_BULK_MAX_OPERATIONS = int(os.getenv("BOOKS_BULK_MAX_OPERATIONS", "1000"))
+BOOKS_BATCH_MAX_IDS = int(os.getenv("BOOKS_BATCH_MAX_IDS", "100"))
+# Días que se conservan las bajas para /api/books/changes/; tokens más antiguos exigen sincronizar todo
+BOOKS_TOMBSTONE_TTL_DAYS = int(os.getenv("BOOKS_TOMBSTONE_TTL_DAYS", "30"))
+# Caché token → usuario de CachedTokenAuthentication; con un alias de CACHES compartido se invalida en todos
+# los procesos. Sin él (o si es LocMemCache) cada worker guarda su copia como mucho BOOKS_TOKEN_CACHE_LOCAL_TTL segundos
+BOOKS_TOKEN_CACHE_SIZE = int(os.getenv("BOOKS_TOKEN_CACHE_SIZE", "1024"))
+BOOKS_TOKEN_CACHE_TTL = int(os.getenv("BOOKS_TOKEN_CACHE_TTL", "300"))
+BOOKS_TOKEN_CACHE_ALIAS = os.getenv("BOOKS_TOKEN_CACHE_ALIAS") or None
+BOOKS_TOKEN_CACHE_LOCAL_TTL = int(os.getenv("BOOKS_TOKEN_CACHE_LOCAL_TTL", "5"))
+
+# Caché de lectura de GET /api/books/{id}/: LRU del proceso delante de la caché BOOKS_DETAIL_CACHE_ALIAS,
+# que debe ser compartida (Redis, Memcached) para que las escrituras invaliden en todos los workers.
+# Sin alias, o si es LocMemCache, está desactivada
+BOOKS_DETAIL_CACHE_SIZE = int(os.getenv("BOOKS_DETAIL_CACHE_SIZE", "1024"))
+BOOKS_DETAIL_CACHE_TTL = int(os.getenv("BOOKS_DETAIL_CACHE_TTL", "300"))
+BOOKS_DETAIL_CACHE_ALIAS = os.getenv("BOOKS_DETAIL_CACHE_ALIAS") or None
+
+# Instantánea columnar en memoria (NumPy) para estadísticas de precio; sin ella se consulta MongoDB
+BOOKS_COLUMNAR_SNAPSHOT = os.getenv("BOOKS_COLUMNAR_SNAPSHOT", "False") == "True"
+BOOKS_SNAPSHOT_MAX_MEMORY_MB = int(os.getenv("BOOKS_SNAPSHOT_MAX_MEMORY_MB", "64"))
+# Segundos que la instantánea puede ir por detrás de la última escritura; esas respuestas no llevan ETag
+BOOKS_SNAPSHOT_MAX_STALENESS = float(os.getenv("BOOKS_SNAPSHOT_MAX_STALENESS", "0"))
+
+# Directorio donde cada worker vuelca sus métricas para que /metrics devuelva los totales de todos;
+# gunicorn.conf.py lo define y lo vacía al arrancar. Sin él las métricas son por proceso
+BOOKS_METRICS_DIR = os.getenv("BOOKS_METRICS_DIR") or None
+BOOKS_METRICS_FLUSH_INTERVAL = float(os.getenv("BOOKS_METRICS_FLUSH_INTERVAL", "1"))
+# Token del scraper de Prometheus para /metrics (Authorization: Bearer <token>); sin él solo administradores
+BOOKS_METRICS_TOKEN = os.getenv("BOOKS_METRICS_TOKEN") or None
+
+# Vistas async (motor) para listado, detalle y estadísticas; requiere servir la app por ASGI
+BOOKS_ASYNC_VIEWS = os.getenv("BOOKS_ASYNC_VIEWS", "False") == "True"
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
@@ -113,6 +183,8 @@ SIMPLE_JWT = {
     "USER_ID_CLAIM": "user_id",
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
     "TOKEN_TYPE_CLAIM": "token_type",
+    "TOKEN_OBTAIN_SERIALIZER": "books.serializers.token_serializer.BookTokenObtainPairSerializer",
+    "TOKEN_USER_CLASS": "books.authentication.ClaimsUser",
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -161,8 +233,18 @@ SWAGGER_SETTINGS = {
     },
     "USE_SESSION_AUTH": False,
     "SECURITY_REQUIREMENTS": [{"Bearer": []}],
+    "DEFAULT_INFO": "book_management.urls.api_info",
+    # Esquema precalculado en lugar de ?format=openapi en cada carga de la UI
+    "SPEC_URL": "openapi-schema",
 }
 
+REDOC_SETTINGS = {
+    "SPEC_URL": "openapi-schema",
+}
+
+# Esquemas OpenAPI generados por `manage.py generate_openapi`, uno por versión del código
+BOOKS_OPENAPI_DIR = os.getenv("BOOKS_OPENAPI_DIR", os.path.join(BASE_DIR, "openapi"))
+
 CSRF_TRUSTED_ORIGINS = [
     "https://*.railway.app",
     "http://*.railway.app",
@@ -3,20 +3,24 @@ from django.urls import path, include
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+from books.views import MetricsView, OpenAPISchemaView
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
 )
 
+# SWAGGER_SETTINGS['DEFAULT_INFO']; también lo usa manage.py generate_openapi
+api_info = openapi.Info(
+    title="Book Management API",
+    default_version='v1',
+    description="API documentation for Book Management",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@bookmanagement.local"),
+    license=openapi.License(name="BSD License"),
+)
+
 schema_view = get_schema_view(
-    openapi.Info(
-        title="Book Management API",
-        default_version='v1',
-        description="API documentation for Book Management",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@bookmanagement.local"),
-        license=openapi.License(name="BSD License"),
-    ),
+    api_info,
     public=True,
     permission_classes=(permissions.AllowAny,),
 )
@@ -26,6 +30,10 @@ urlpatterns = [
     path('api/', include('books.urls')),
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-    path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('openapi.json', OpenAPISchemaView.as_view(), name='openapi-schema'),
+    path('openapi-<str:version>.json', OpenAPISchemaView.as_view(), name='openapi-schema-version'),
+    # /api/token/ lo atiende antes books.urls (token de DRF)
+    path('api/token/pair/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
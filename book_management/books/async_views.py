@@ -0,0 +1,130 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .filters import BookFieldsSerializer, BookFilterSerializer
+from .repository import AsyncBookRepository
+from .serializers.book_serializer import BookReadSerializer
+from .utils.conditional import (
+    async_collection_validators,
+    book_validators,
+    evaluate_preconditions,
+    set_validators,
+)
+from .utils.snapshot import get_snapshot, set_snapshot_validators, snapshot_enabled
+from .views import BookDetailView, BookListCreateView, BookYearStatsView
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView con handlers `async def`.
+
+    DRF 3.14 solo despacha vistas síncronas: aquí la autenticación, permisos y
+    throttling (que usan el ORM) se ejecutan en un hilo y el handler se espera
+    en el event loop, que queda libre mientras se consulta MongoDB.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+# Las escrituras y las rutas poco frecuentes reutilizan la vista síncrona en un hilo
+
+class AsyncBookListCreateView(AsyncAPIView, BookListCreateView):
+    async def get(self, request):
+        filters = BookFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, last_modified = await async_collection_validators(request)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        paginator = self.pagination_class()
+        books = await paginator.async_paginate_books(
+            AsyncBookRepository(),
+            filters.validated_data,
+            request,
+            view=self,
+            ordering=filters.validated_data['ordering'],
+            fields=filters.validated_data['fields']
+        )
+        response = paginator.get_paginated_response(
+            BookReadSerializer(books, many=True, fields=filters.validated_data['fields']).data
+        )
+        return set_validators(response, etag, last_modified)
+
+    async def post(self, request):
+        return await sync_to_async(super().post)(request)
+
+
+class AsyncBookDetailView(AsyncAPIView, BookDetailView):
+    async def get(self, request, pk):
+        selection = BookFieldsSerializer(data=request.query_params)
+        if not selection.is_valid():
+            return Response(selection.errors, status=status.HTTP_400_BAD_REQUEST)
+        fields = selection.validated_data['fields']
+
+        # updated_at siempre se lee para el ETag aunque no se devuelva
+        book = await AsyncBookRepository().get(pk, fields=fields and [*fields, 'updated_at'])
+        if book is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        etag, last_modified = book_validators(request, book['id'], book.get('updated_at'), fields)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(
+            Response(BookReadSerializer(book, fields=fields).data), etag, last_modified
+        )
+
+    async def put(self, request, pk):
+        return await sync_to_async(super().put)(request, pk)
+
+    async def delete(self, request, pk):
+        return await sync_to_async(super().delete)(request, pk)
+
+
+class AsyncBookYearStatsView(AsyncAPIView, BookYearStatsView):
+    async def get(self, request, year):
+        if request.query_params.get('check') == 'true':
+            return await sync_to_async(super().get)(request, year)
+
+        etag, last_modified = await async_collection_validators(request)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        # La instantánea se refresca con pymongo: fuera del event loop
+        snapshot = await sync_to_async(get_snapshot)(last_modified) if snapshot_enabled() else None
+        if snapshot is not None:
+            stats = snapshot.year_stats(year)
+        else:
+            stats = await AsyncBookRepository().year_stats(year)
+        if stats is None:
+            return Response({
+                'message': f'No books found for year {year}'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return set_snapshot_validators(Response(stats), snapshot, etag, last_modified)
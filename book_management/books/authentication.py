@@ -0,0 +1,235 @@
+import copy
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.utils.functional import cached_property
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+
+from .utils.shared_cache import shared_cache
+
+
+class TokenCache:
+    """
+    Caché token → (usuario, token) con TTL.
+
+    Con un alias de CACHES compartido (Redis, Memcached, archivos) las entradas
+    viven allí e invalidar un token en un worker afecta a todos. Sin él se usa
+    un LRU en memoria del proceso, pero la invalidación solo llega al worker que
+    la hace: los demás podrían aceptar un token borrado o un usuario desactivado
+    hasta que caduque su copia, así que el TTL se limita a `local_ttl` segundos.
+    """
+
+    def __init__(self, maxsize, ttl, alias=None, local_ttl=5):
+        self.maxsize = maxsize
+        self.shared = shared_cache(alias)
+        self.ttl = ttl if self.shared is not None else min(ttl, local_ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _shared_key(key):
+        # La clave del token no se guarda en claro fuera del proceso
+        return 'auth_token:' + hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key):
+        if self.shared is not None:
+            value = self.shared.get(self._shared_key(key))
+            with self._lock:
+                self._count(value)
+            return value
+        with self._lock:
+            value = self._get_local(key)
+            self._count(value)
+            return value
+
+    def _count(self, value):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def set(self, key, value):
+        if self.shared is not None:
+            self.shared.set(self._shared_key(key), value, timeout=self.ttl)
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        if self.shared is not None:
+            self.shared.delete(self._shared_key(key))
+        with self._lock:
+            self._entries.pop(key, None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'shared' if self.shared is not None else 'local',
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+_token_cache = None
+_token_cache_lock = threading.Lock()
+
+
+def get_token_cache():
+    global _token_cache
+    if _token_cache is None:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = TokenCache(
+                    settings.BOOKS_TOKEN_CACHE_SIZE,
+                    settings.BOOKS_TOKEN_CACHE_TTL,
+                    settings.BOOKS_TOKEN_CACHE_ALIAS,
+                    settings.BOOKS_TOKEN_CACHE_LOCAL_TTL,
+                )
+    return _token_cache
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication que evita la consulta token + usuario en cada petición.
+
+    Los tokens borrados (logout) y los usuarios modificados se invalidan desde
+    books/signals.py; las claves inválidas no se cachean.
+    """
+
+    def authenticate_credentials(self, key):
+        cache = get_token_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            user, token = cached
+            # Cada petición recibe su propia copia del usuario
+            return copy.copy(user), token
+        user, token = super().authenticate_credentials(key)
+        cache.set(key, (user, token))
+        return user, token
+
+
+# request.auth del scraper de Prometheus; no corresponde a ningún usuario
+METRICS_SCRAPER = object()
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <BOOKS_METRICS_TOKEN>` para el scraper de /metrics.
+
+    Así Prometheus no necesita el token de un administrador. Cualquier otra
+    cabecera pasa a las autenticaciones por defecto.
+    """
+
+    def authenticate(self, request):
+        token = settings.BOOKS_METRICS_TOKEN
+        header = get_authorization_header(request).split()
+        if not token or len(header) != 2 or header[0].lower() != b'bearer':
+            return None
+        if not hmac.compare_digest(header[1], token.encode('utf-8')):
+            return None
+        return AnonymousUser(), METRICS_SCRAPER
+
+    def authenticate_header(self, request):
+        return 'Bearer'
+
+
+class ClaimsUser(TokenUser):
+    """
+    Usuario de JWTStatelessUserAuthentication (SIMPLE_JWT['TOKEN_USER_CLASS']).
+
+    id, username, is_staff e is_superuser salen de los claims firmados del token,
+    sin consultar la base de datos. Cualquier otro atributo o permiso carga el
+    User real la primera vez que se usa.
+    """
+
+    @cached_property
+    def _user(self):
+        try:
+            return User.objects.get(pk=self.id)
+        except User.DoesNotExist:
+            # Igual que JWTAuthentication.get_user: 401 en vez de un 500
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+    def _claim(self, name):
+        if name in self.token:
+            return self.token[name]
+        # Tokens emitidos antes de incluir el claim
+        return getattr(self._user, name)
+
+    @cached_property
+    def username(self):
+        return self._claim('username')
+
+    @cached_property
+    def is_staff(self):
+        return self._claim('is_staff')
+
+    @cached_property
+    def is_superuser(self):
+        return self._claim('is_superuser')
+
+    @property
+    def groups(self):
+        return self._user.groups
+
+    @property
+    def user_permissions(self):
+        return self._user.user_permissions
+
+    def get_group_permissions(self, obj=None):
+        return self._user.get_group_permissions(obj)
+
+    def get_all_permissions(self, obj=None):
+        return self._user.get_all_permissions(obj)
+
+    def has_perm(self, perm, obj=None):
+        return self._user.has_perm(perm, obj)
+
+    def has_perms(self, perm_list, obj=None):
+        return self._user.has_perms(perm_list, obj)
+
+    def has_module_perms(self, module):
+        return self._user.has_module_perms(module)
+
+    def __getattr__(self, attr):
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+        return getattr(self._user, attr)
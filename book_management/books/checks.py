@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def columnar_snapshot_check(app_configs, **kwargs):
+    from .utils.snapshot import np
+
+    if settings.BOOKS_COLUMNAR_SNAPSHOT and np is None:
+        return [Warning(
+            'BOOKS_COLUMNAR_SNAPSHOT is enabled but NumPy is not installed',
+            hint='Install numpy; until then statistics are computed in MongoDB.',
+            id='books.W001',
+        )]
+    return []
+
+
+@register()
+def token_cache_check(app_configs, **kwargs):
+    from .utils.shared_cache import shared_cache
+
+    alias = settings.BOOKS_TOKEN_CACHE_ALIAS
+    if alias and shared_cache(alias) is None:
+        return [Warning(
+            f'BOOKS_TOKEN_CACHE_ALIAS "{alias}" is not shared between processes',
+            hint='Use a Redis, Memcached or file-based cache; until then each worker '
+                 'caches tokens for at most BOOKS_TOKEN_CACHE_LOCAL_TTL seconds.',
+            id='books.W002',
+        )]
+    return []
+
+
+@register()
+def book_cache_check(app_configs, **kwargs):
+    from .utils.shared_cache import shared_cache
+
+    alias = settings.BOOKS_DETAIL_CACHE_ALIAS
+    if alias and shared_cache(alias) is None:
+        return [Warning(
+            f'BOOKS_DETAIL_CACHE_ALIAS "{alias}" is not shared between processes',
+            hint='Use a Redis, Memcached or file-based cache; until then the book detail cache is disabled.',
+            id='books.W003',
+        )]
+    return []
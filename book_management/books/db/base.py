@@ -0,0 +1,23 @@
+from collections import OrderedDict
+
+from bson.codec_options import CodecOptions
+from djongo import base
+
+from ..utils.mongo_connection import MongoDBConnection
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Backend djongo que usa el MongoClient compartido del proceso en lugar de crear otro."""
+
+    def get_new_connection(self, connection_params):
+        mongo = MongoDBConnection.get_instance()
+        self.client_connection = mongo.get_client()
+        database = mongo.get_database(connection_params['name']).with_options(
+            codec_options=CodecOptions(document_class=OrderedDict)
+        )
+        self.djongo_connection = base.DjongoClient(database, connection_params['enforce_schema'])
+        return database
+
+    def _close(self):
+        # Django cierra la conexión al terminar cada petición; el pool compartido sigue abierto
+        pass
@@ -0,0 +1,135 @@
+from datetime import datetime, time
+
+from rest_framework import serializers
+
+from .serializers.book_serializer import BookReadSerializer
+
+# Solo campos con índice (campo, id) en Book.Meta.indexes, para que no se puedan pedir ordenaciones sin índice
+ORDERING_FIELDS = ('created_at', 'published_date', 'price', 'title', 'author', 'genre')
+ORDERING_CHOICES = ORDERING_FIELDS + tuple(f'-{field}' for field in ORDERING_FIELDS)
+
+
+class BookFieldsSerializer(serializers.Serializer):
+    """?fields= o ?exclude=: lista de campos separados por comas para la respuesta."""
+    fields = serializers.CharField(required=False)
+    exclude = serializers.CharField(required=False)
+
+    def _field_names(self, value):
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in BookReadSerializer.fields]
+        if unknown:
+            raise serializers.ValidationError(f'Unknown fields: {", ".join(unknown)}')
+        return names
+
+    def validate_fields(self, value):
+        return self._field_names(value)
+
+    def validate_exclude(self, value):
+        return self._field_names(value)
+
+    def validate(self, data):
+        if 'fields' in data and 'exclude' in data:
+            raise serializers.ValidationError({
+                'exclude': 'Cannot be combined with fields'
+            })
+        selected = None
+        # Se conserva el orden de BookSerializer.Meta.fields
+        if 'fields' in data:
+            selected = tuple(field for field in BookReadSerializer.fields if field in data['fields'])
+        elif 'exclude' in data:
+            selected = tuple(field for field in BookReadSerializer.fields if field not in data['exclude'])
+        if selected == ():
+            raise serializers.ValidationError({
+                'fields': 'At least one field must be selected'
+            })
+        return {**data, 'fields': selected}
+
+
+class BookQuerySerializer(serializers.Serializer):
+    """Filtros sobre los libros, comunes al listado, la exportación y las estadísticas."""
+    author = serializers.CharField(required=False)
+    genre = serializers.CharField(required=False)
+    price_min = serializers.FloatField(required=False)
+    price_max = serializers.FloatField(required=False)
+    published_after = serializers.DateField(required=False)
+    published_before = serializers.DateField(required=False)
+
+    def validate(self, data):
+        if 'price_min' in data and 'price_max' in data and data['price_min'] > data['price_max']:
+            raise serializers.ValidationError({
+                'price_max': 'Must be greater than or equal to price_min'
+            })
+        if ('published_after' in data and 'published_before' in data
+                and data['published_after'] > data['published_before']):
+            raise serializers.ValidationError({
+                'published_before': 'Must be on or after published_after'
+            })
+        return super().validate(data)
+
+
+class BookFilterSerializer(BookQuerySerializer, BookFieldsSerializer):
+    ordering = serializers.ChoiceField(choices=ORDERING_CHOICES, default='created_at')
+
+
+class BookFacetStatsSerializer(BookQuerySerializer):
+    # Géneros y autores con más libros que se devuelven
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class PriceDistributionSerializer(serializers.Serializer):
+    year = serializers.IntegerField(min_value=1, max_value=9998, required=False)
+    genre = serializers.CharField(required=False)
+    author = serializers.CharField(required=False)
+    bins = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    percentiles = serializers.CharField(default='5,25,50,75,95')
+
+    def validate_percentiles(self, value):
+        try:
+            percentiles = [float(percentile) for percentile in value.split(',') if percentile.strip()]
+        except ValueError:
+            percentiles = None
+        if not percentiles or len(percentiles) > 20 or not all(0 <= p <= 100 for p in percentiles):
+            raise serializers.ValidationError('Must be a list of up to 20 numbers between 0 and 100')
+        return percentiles
+
+
+def filter_books(queryset, filters):
+    """Aplica los filtros validados a un queryset de Book; los límites son inclusivos."""
+    lookups = {
+        'author': filters.get('author'),
+        'genre': filters.get('genre'),
+        'price__gte': filters.get('price_min'),
+        'price__lte': filters.get('price_max'),
+        'published_date__gte': filters.get('published_after'),
+        'published_date__lte': filters.get('published_before'),
+    }
+    return queryset.filter(**{
+        lookup: value for lookup, value in lookups.items() if value is not None
+    })
+
+
+def books_mongo_query(filters):
+    """Mismos filtros que filter_books, como consulta de MongoDB."""
+    query = {}
+    for field in ('author', 'genre'):
+        if filters.get(field) is not None:
+            query[field] = filters[field]
+
+    price = {}
+    if filters.get('price_min') is not None:
+        price['$gte'] = filters['price_min']
+    if filters.get('price_max') is not None:
+        price['$lte'] = filters['price_max']
+    if price:
+        query['price'] = price
+
+    # djongo guarda los DateField como datetime a medianoche
+    published_date = {}
+    if filters.get('published_after') is not None:
+        published_date['$gte'] = datetime.combine(filters['published_after'], time.min)
+    if filters.get('published_before') is not None:
+        published_date['$lte'] = datetime.combine(filters['published_before'], time.min)
+    if published_date:
+        query['published_date'] = published_date
+
+    return query
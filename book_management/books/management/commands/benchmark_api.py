@@ -0,0 +1,351 @@
+import asyncio
+import io
+import json
+import platform
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from books.models import Book
+from books.utils.book_cache import get_book_cache
+from books.utils.bulk import reserve_book_ids
+from books.utils.conditional import bump_collection_version
+from books.utils.mongo_connection import MongoDBConnection
+from books.utils.stats import rebuild_year_stats
+
+SCENARIOS = ('list', 'detail', 'create', 'bulk', 'stats')
+# Métricas comparadas con la línea base; True si un valor mayor es peor
+COMPARED_METRICS = {'p50_ms': True, 'p95_ms': True, 'p99_ms': True, 'rps': False}
+DATASET_COLLECTION = 'benchmark_dataset'
+GENRES = ('Ficción', 'Ensayo', 'Poesía', 'Historia', 'Ciencia', 'Biografía', 'Infantil', 'Teatro')
+FIRST_DATE = date(1900, 1, 1)
+LAST_DATE = date(2024, 12, 31)
+SEED_BATCH_SIZE = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide latencia (p50/p95/p99) y req/s de los endpoints de libros sobre un conjunto '
+        'de datos reproducible, y compara el resultado con una línea base'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--books',
+            type=int,
+            default=1000,
+            help='Libros del conjunto de datos (1000, 100000, 1000000...)',
+        )
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'Subconjunto de {", ".join(SCENARIOS)}')
+        parser.add_argument('--requests', type=int, default=500, help='Peticiones medidas por escenario')
+        parser.add_argument('--warmup', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--interface', choices=['wsgi', 'asgi'], default='wsgi')
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument('--bulk-size', type=int, default=50, help='Operaciones por petición de bulk')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--database',
+            help='Base de datos de MongoDB para el benchmark (por defecto <nombre>_benchmark)',
+        )
+        parser.add_argument('--reseed', action='store_true', help='Vuelve a generar los libros aunque ya existan')
+        parser.add_argument('--output', help='Archivo JSON de resultados (por defecto se escribe en stdout)')
+        parser.add_argument('--baseline', help='Resultados guardados con los que comparar')
+        parser.add_argument('--compare', help='Compara este archivo de resultados con --baseline sin ejecutar nada')
+        parser.add_argument('--tolerance', type=float, default=0.1, help='Empeoramiento admitido (0.1 = 10%%)')
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            if not options['baseline']:
+                raise CommandError('--compare requiere --baseline')
+            self._check_regressions(
+                self._load(options['compare']), self._load(options['baseline']), options['tolerance']
+            )
+            return
+
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Escenarios desconocidos: {", ".join(sorted(unknown))}')
+        for option in ('books', 'requests', 'concurrency', 'page_size', 'bulk_size'):
+            if options[option] < 1:
+                raise CommandError(f'--{option.replace("_", "-")} debe ser mayor que cero')
+        if settings.DEBUG:
+            self.stderr.write(self.style.WARNING('DEBUG=True guarda cada consulta y distorsiona los tiempos'))
+
+        baseline = self._load(options['baseline']) if options['baseline'] else None
+        original_name = settings.DATABASES['default']['NAME']
+        database = options['database'] or f'{original_name}_benchmark'
+        if database == original_name:
+            raise CommandError('El benchmark no puede usar la base de datos de la aplicación')
+
+        self._use_database(database)
+        try:
+            results = self._run(database, scenarios, options)
+        finally:
+            self._use_database(original_name)
+
+        output = json.dumps(results, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            self._check_regressions(results, baseline, options['tolerance'])
+
+    def _use_database(self, name):
+        # Igual que el runner de tests: settings_dict es el mismo dict que settings.DATABASES
+        connection.close()
+        connection.settings_dict['NAME'] = name
+
+    def _run(self, database, scenarios, options):
+        call_command('migrate', run_syncdb=True, verbosity=0, interactive=False)
+        call_command('ensure_indexes', stdout=io.StringIO())
+        dataset = self._seed(options['books'], options['seed'], options['reseed'])
+
+        user, _ = User.objects.get_or_create(username='benchmark')
+        token, _ = Token.objects.get_or_create(user=user)
+        self.authorization = f'Token {token.key}'
+        self.options = options
+
+        results = {
+            'meta': {
+                'books': options['books'],
+                'seed': options['seed'],
+                'interface': options['interface'],
+                'async_views': settings.BOOKS_ASYNC_VIEWS,
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+                'page_size': options['page_size'],
+                'bulk_size': options['bulk_size'],
+                'database': database,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'started_at': timezone.now().isoformat(),
+            },
+            'scenarios': {},
+        }
+        try:
+            for scenario in scenarios:
+                rng = random.Random(f'{options["seed"]}:{scenario}')
+                build = getattr(self, f'_{scenario}_request')
+                warmup = [build(rng, dataset) for _ in range(options['warmup'])]
+                measured = [build(rng, dataset) for _ in range(options['requests'])]
+                self._send_all(warmup)
+                timings, statuses, elapsed = self._send_all(measured)
+                results['scenarios'][scenario] = summary = self._summarize(timings, statuses, elapsed)
+                self.stderr.write(
+                    f'{scenario:<8} {summary["rps"]:>9.1f} req/s  p50 {summary["p50_ms"]:>8.2f}ms  '
+                    f'p95 {summary["p95_ms"]:>8.2f}ms  p99 {summary["p99_ms"]:>8.2f}ms  '
+                    f'errores {summary["errors"]}'
+                )
+        finally:
+            self._restore(dataset)
+        return results
+
+    def _seed(self, count, seed, reseed):
+        """Genera `count` libros deterministas con escrituras directas o reutiliza los ya generados."""
+        mongo = MongoDBConnection.get_instance()
+        books = mongo.get_collection(Book._meta.db_table)
+        datasets = mongo.get_collection(DATASET_COLLECTION)
+        dataset = datasets.find_one({'_id': 'books'})
+        if not reseed and dataset and (dataset['count'], dataset['seed']) == (count, seed):
+            self._restore(dataset)
+            self.stderr.write(f'Se reutilizan {count} libros de {mongo.get_database().name}')
+            return dataset
+
+        books.delete_many({})
+        ids = reserve_book_ids(count)
+        rng = random.Random(seed)
+        created_at = datetime(2024, 1, 1)
+        years = set()
+        started = time.monotonic()
+        for start in range(0, count, SEED_BATCH_SIZE):
+            batch = []
+            for pk in ids[start:start + SEED_BATCH_SIZE]:
+                published_date = self._random_date(rng)
+                years.add(published_date.year)
+                batch.append({
+                    'id': pk,
+                    'title': f'Libro {pk}',
+                    'author': f'Autor {rng.randrange(1000)}',
+                    'published_date': datetime.combine(published_date, datetime.min.time()),
+                    'genre': rng.choice(GENRES),
+                    'price': round(rng.uniform(5, 100), 2),
+                    'created_at': created_at + timedelta(seconds=pk),
+                    'updated_at': created_at + timedelta(seconds=pk),
+                })
+            books.insert_many(batch, ordered=False)
+            self.stderr.write(f'{min(start + SEED_BATCH_SIZE, count)}/{count} libros generados')
+
+        # Las escrituras directas no pasan por las señales del modelo
+        rebuild_year_stats()
+        bump_collection_version()
+        get_book_cache().invalidate_all()
+        dataset = {
+            '_id': 'books',
+            'count': count,
+            'seed': seed,
+            'first_id': ids[0],
+            'last_id': ids[-1],
+            # Las estadísticas se piden solo para años con libros
+            'years': sorted(years),
+        }
+        datasets.replace_one({'_id': 'books'}, dataset, upsert=True)
+        self.stderr.write(f'{count} libros generados en {time.monotonic() - started:.1f}s')
+        return dataset
+
+    def _restore(self, dataset):
+        # Elimina los libros creados por los escenarios para que la siguiente ejecución parta del mismo estado
+        books = MongoDBConnection.get_instance().get_collection(Book._meta.db_table)
+        if books.delete_many({'id': {'$gt': dataset['last_id']}}).deleted_count:
+            rebuild_year_stats()
+            bump_collection_version()
+            get_book_cache().invalidate_all()
+
+    def _random_date(self, rng):
+        return FIRST_DATE + timedelta(days=rng.randrange((LAST_DATE - FIRST_DATE).days))
+
+    def _new_book(self, rng):
+        return {
+            'title': f'Libro nuevo {rng.randrange(10 ** 9)}',
+            'author': f'Autor {rng.randrange(1000)}',
+            'published_date': self._random_date(rng).isoformat(),
+            'genre': rng.choice(GENRES),
+            'price': round(rng.uniform(5, 100), 2),
+        }
+
+    def _list_request(self, rng, dataset):
+        return 'get', '/api/books/', {'page_size': self.options['page_size']}
+
+    def _detail_request(self, rng, dataset):
+        return 'get', f'/api/books/{rng.randint(dataset["first_id"], dataset["last_id"])}/', None
+
+    def _create_request(self, rng, dataset):
+        return 'post', '/api/books/', self._new_book(rng)
+
+    def _bulk_request(self, rng, dataset):
+        operations = [
+            {'op': 'create', 'data': self._new_book(rng)} for _ in range(self.options['bulk_size'])
+        ]
+        return 'post', '/api/books/bulk/', {'operations': operations, 'ordered': False}
+
+    def _stats_request(self, rng, dataset):
+        return 'get', f'/api/books/stats/year/{rng.choice(dataset["years"])}/', None
+
+    def _send_all(self, requests):
+        if self.options['interface'] == 'asgi':
+            return asyncio.run(self._send_all_async(requests))
+
+        # Un cliente (y una conexión de Django) por hilo, como los hilos de un worker gthread
+        local = threading.local()
+
+        def send(request):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client(raise_request_exception=False)
+            method, path, data = request
+            kwargs = {'content_type': 'application/json'} if method == 'post' else {}
+            started = time.perf_counter()
+            response = getattr(client, method)(
+                path, data, HTTP_AUTHORIZATION=self.authorization, **kwargs
+            )
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(self.options['concurrency']) as pool:
+            results = list(pool.map(send, requests))
+        return [timing for timing, _ in results], [code for _, code in results], time.perf_counter() - started
+
+    async def _send_all_async(self, requests):
+        client = AsyncClient(raise_request_exception=False)
+        semaphore = asyncio.Semaphore(self.options['concurrency'])
+
+        async def send(request):
+            method, path, data = request
+            kwargs = {'content_type': 'application/json'} if method == 'post' else {}
+            async with semaphore:
+                started = time.perf_counter()
+                response = await getattr(client, method)(
+                    path, data, AUTHORIZATION=self.authorization, **kwargs
+                )
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(send(request) for request in requests))
+        return [timing for timing, _ in results], [code for _, code in results], time.perf_counter() - started
+
+    def _summarize(self, timings, statuses, elapsed):
+        timings = [timing * 1000 for timing in timings]
+        if len(timings) > 1:
+            cuts = statistics.quantiles(timings, n=100, method='inclusive')
+            p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+        else:
+            p50 = p95 = p99 = timings[0]
+        return {
+            'requests': len(timings),
+            'errors': sum(1 for code in statuses if code >= 400),
+            'rps': round(len(timings) / elapsed, 2),
+            'mean_ms': round(statistics.fmean(timings), 3),
+            'p50_ms': round(p50, 3),
+            'p95_ms': round(p95, 3),
+            'p99_ms': round(p99, 3),
+            'max_ms': round(max(timings), 3),
+        }
+
+    def _load(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                results = json.load(file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'No se pudo leer {path}: {error}')
+        if 'scenarios' not in results:
+            raise CommandError(f'{path} no contiene resultados de benchmark_api')
+        return results
+
+    def _check_regressions(self, results, baseline, tolerance):
+        meta, base_meta = results.get('meta', {}), baseline.get('meta', {})
+        for key in ('books', 'interface', 'async_views', 'concurrency'):
+            if meta.get(key) != base_meta.get(key):
+                self.stderr.write(self.style.WARNING(
+                    f'{key} difiere de la línea base ({base_meta.get(key)} → {meta.get(key)}); '
+                    'la comparación es orientativa'
+                ))
+
+        regressions = 0
+        for scenario, summary in results['scenarios'].items():
+            base = baseline['scenarios'].get(scenario)
+            if base is None:
+                self.stderr.write(f'{scenario}: sin línea base')
+                continue
+            for metric, higher_is_worse in COMPARED_METRICS.items():
+                current, previous = summary[metric], base[metric]
+                change = (current - previous) / previous if previous else 0.0
+                worse = change > tolerance if higher_is_worse else change < -tolerance
+                line = f'{scenario:<8} {metric:<7} {previous:>10.2f} → {current:>10.2f} ({change:+.1%})'
+                if worse:
+                    regressions += 1
+                    self.stderr.write(self.style.ERROR(line + '  REGRESIÓN'))
+                else:
+                    self.stderr.write(line)
+
+        if regressions:
+            raise CommandError(
+                f'{regressions} métricas empeoraron más de un {tolerance:.0%} respecto a la línea base'
+            )
+        self.stderr.write(self.style.SUCCESS('Sin regresiones respecto a la línea base'))
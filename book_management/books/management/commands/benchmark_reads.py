@@ -0,0 +1,87 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.filters import filter_books
+from books.models import Book
+from books.repository import BookRepository
+from books.serializers.book_serializer import BookReadSerializer, BookSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara la latencia de lectura del ORM (djongo) con la de BookRepository (pymongo directo)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--page-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations debe ser mayor que cero')
+
+        repository = BookRepository()
+        # Solo libros con id numérico, que son los que el ORM puede buscar
+        sample = repository.collection.find_one({'id': {'$type': 'number'}}, {'id': 1, 'author': 1})
+        if sample is None:
+            raise CommandError('No hay libros para medir; cargue datos con import_books')
+
+        pk = sample['id']
+        author = sample['author']
+        page_size = options['page_size']
+        cases = [
+            (
+                'get por id',
+                lambda: BookSerializer(Book.objects.get(pk=pk)).data,
+                lambda: BookReadSerializer(repository.get(pk)).data,
+            ),
+            (
+                f'listado ({page_size})',
+                lambda: BookSerializer(
+                    Book.objects.order_by('created_at', 'id')[:page_size], many=True
+                ).data,
+                lambda: BookReadSerializer(repository.list(limit=page_size), many=True).data,
+            ),
+            (
+                f'filtrado por autor ({page_size})',
+                lambda: BookSerializer(
+                    filter_books(Book.objects.all(), {'author': author})
+                    .order_by('-price', '-id')[:page_size],
+                    many=True,
+                ).data,
+                lambda: BookReadSerializer(
+                    repository.list({'author': author}, ordering='-price', limit=page_size),
+                    many=True,
+                ).data,
+            ),
+        ]
+
+        self.stdout.write(
+            f'{"caso":<28}{"ORM p50":>10}{"ORM p95":>10}{"repo p50":>10}{"repo p95":>10}{"mejora":>9}'
+        )
+        for name, orm, raw in cases:
+            orm_timings = self._measure(orm, options['iterations'], options['warmup'])
+            raw_timings = self._measure(raw, options['iterations'], options['warmup'])
+            orm_p50, orm_p95 = self._percentiles(orm_timings)
+            raw_p50, raw_p95 = self._percentiles(raw_timings)
+            self.stdout.write(
+                f'{name:<28}{orm_p50:>8.2f}ms{orm_p95:>8.2f}ms'
+                f'{raw_p50:>8.2f}ms{raw_p95:>8.2f}ms{orm_p50 / raw_p50:>8.1f}x'
+            )
+
+    def _measure(self, function, iterations, warmup):
+        for _ in range(warmup):
+            function()
+        timings = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
+
+    def _percentiles(self, timings):
+        if len(timings) < 2:
+            return timings[0], timings[0]
+        cuts = statistics.quantiles(timings, n=20)
+        return statistics.median(timings), cuts[18]
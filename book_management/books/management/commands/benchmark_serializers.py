@@ -0,0 +1,59 @@
+import time
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from books.models import Book
+from books.serializers.book_serializer import BookReadSerializer, BookSerializer
+
+
+class Command(BaseCommand):
+    help = 'Compara BookSerializer con BookReadSerializer serializando libros en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        if options['count'] < 1 or options['repeat'] < 1:
+            raise CommandError('--count y --repeat deben ser mayores que cero')
+
+        # Sin base de datos: solo se mide el costo de serializar
+        created_at = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+        books = [
+            Book(
+                id=i,
+                title=f'Libro {i}',
+                author=f'Autor {i % 100}',
+                published_date=date(1950, 1, 1) + timedelta(days=i),
+                genre='Ficción',
+                price=10 + i % 50 + 0.99,
+                created_at=created_at + timedelta(seconds=i, microseconds=i),
+                updated_at=created_at + timedelta(seconds=i, microseconds=i),
+            )
+            for i in range(1, options['count'] + 1)
+        ]
+        documents = [
+            {field: getattr(book, field) for field in BookReadSerializer.fields}
+            for book in books
+        ]
+
+        expected = BookSerializer(books, many=True).data
+        if BookReadSerializer(documents, many=True).data != expected:
+            raise CommandError('BookReadSerializer no produce la misma salida que BookSerializer')
+
+        model_time = self._best_of(lambda: BookSerializer(books, many=True).data, options['repeat'])
+        read_time = self._best_of(lambda: BookReadSerializer(documents, many=True).data, options['repeat'])
+
+        self.stdout.write(f'{options["count"]} libros, mejor de {options["repeat"]} ejecuciones')
+        self.stdout.write(f'BookSerializer:     {model_time * 1000:8.1f}ms')
+        self.stdout.write(f'BookReadSerializer: {read_time * 1000:8.1f}ms')
+        self.stdout.write(self.style.SUCCESS(f'Mejora: {model_time / read_time:.1f}x'))
+
+    def _best_of(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
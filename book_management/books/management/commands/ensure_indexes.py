@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from pymongo.errors import OperationFailure
+
+from books.utils.indexes import declared_indexes
+from books.utils.mongo_connection import MongoDBConnection
+
+
+class Command(BaseCommand):
+    help = 'Crea los índices declarados que faltan en MongoDB e informa de los no usados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='No crea índices; termina con error si falta alguno',
+        )
+
+    def handle(self, *args, **options):
+        mongo = MongoDBConnection.get_instance()
+        missing_total = 0
+
+        for collection_name, expected in declared_indexes().items():
+            collection = mongo.get_collection(collection_name)
+            existing = collection.index_information()
+            existing_keys = {tuple(info['key']): name for name, info in existing.items()}
+
+            missing = []
+            for index in expected:
+                name = index.document['name']
+                keys = tuple(index.document['key'].items())
+                if name in existing:
+                    continue
+                if keys in existing_keys:
+                    self.stdout.write(self.style.WARNING(
+                        f'{collection_name}: {name} ya existe con el nombre {existing_keys[keys]}'
+                    ))
+                    continue
+                missing.append(index)
+
+            declared_names = {index.document['name'] for index in expected} | {'_id_'}
+            declared_keys = {tuple(index.document['key'].items()) for index in expected}
+            for name, info in sorted(existing.items()):
+                if name not in declared_names and tuple(info['key']) not in declared_keys:
+                    self.stdout.write(f'{collection_name}: índice no declarado {name}')
+
+            for name in self._unused_indexes(collection):
+                self.stdout.write(self.style.WARNING(f'{collection_name}: índice sin uso {name}'))
+
+            missing_total += len(missing)
+            for index in missing:
+                self.stdout.write(f'{collection_name}: falta {index.document["name"]}')
+            if missing and not options['check']:
+                collection.create_indexes(missing)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{collection_name}: se crearon {len(missing)} índices'
+                ))
+
+        if options['check'] and missing_total:
+            raise CommandError(f'Faltan {missing_total} índices')
+        self.stdout.write(self.style.SUCCESS('Índices verificados'))
+
+    def _unused_indexes(self, collection):
+        try:
+            stats = list(collection.aggregate([{'$indexStats': {}}]))
+        except OperationFailure as error:
+            self.stdout.write(self.style.WARNING(f'$indexStats no disponible: {error}'))
+            return []
+        return sorted(
+            stat['name'] for stat in stats
+            if stat['name'] != '_id_' and stat['accesses']['ops'] == 0
+        )
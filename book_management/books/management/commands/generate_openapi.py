@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from books.utils import openapi
+
+
+class Command(BaseCommand):
+    help = 'Genera el esquema OpenAPI de la versión actual del código para servirlo precalculado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Lo regenera aunque ya exista')
+
+    def handle(self, *args, **options):
+        path = openapi.schema_path()
+        if path.exists() and not options['force']:
+            self.stdout.write(f'El esquema {path.name} ya existe')
+            return
+
+        started = time.monotonic()
+        content = openapi.generate_schema()
+        openapi.write_schema(content, path)
+        # Los esquemas de versiones anteriores ya no se sirven
+        for previous in path.parent.glob('openapi-*.json'):
+            if previous != path:
+                previous.unlink()
+        self.stdout.write(self.style.SUCCESS(
+            f'Esquema {path.name} generado en {time.monotonic() - started:.1f}s ({len(content)} bytes)'
+        ))
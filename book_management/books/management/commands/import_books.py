@@ -0,0 +1,156 @@
+import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pymongo import InsertOne, UpdateOne
+from rest_framework import serializers
+
+from books.models import Book
+from books.serializers.book_serializer import BookSerializer, book_validated_data_to_document
+from books.utils.book_cache import get_book_cache
+from books.utils.bulk import reserve_book_ids
+from books.utils.changes import require_full_resync
+from books.utils.conditional import bump_collection_version
+from books.utils.mongo_connection import MongoDBConnection
+from books.utils.stats import rebuild_year_stats
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+PROGRESS_INTERVAL = 5
+
+
+class Command(BaseCommand):
+    help = 'Importa libros desde archivos CSV o JSONL en lotes, sin cargarlos completos en memoria'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Archivos .csv, .jsonl o .ndjson')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Fuerza el formato de entrada')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        mode = parser.add_mutually_exclusive_group()
+        mode.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Actualiza los libros existentes con el mismo título y autor en lugar de duplicarlos',
+        )
+        mode.add_argument(
+            '--replace',
+            action='store_true',
+            help='Elimina todos los libros antes de importar',
+        )
+        parser.add_argument(
+            '--max-errors',
+            type=int,
+            default=20,
+            help='Cantidad máxima de filas inválidas que se muestran',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor que cero')
+
+        collection = MongoDBConnection.get_instance().get_collection(Book._meta.db_table)
+        if options['replace']:
+            collection.delete_many({})
+            # Las bajas no dejan tombstones: los clientes deben volver a sincronizar todo
+            require_full_resync()
+
+        self.valid_rows = 0
+        self.invalid_rows = 0
+        self.max_errors = options['max_errors']
+        self.started = self.last_report = time.monotonic()
+
+        for path in options['paths']:
+            rows = self._read_rows(Path(path), options['format'])
+            documents = self._validate(path, rows)
+            for batch in self._batches(documents, options['batch_size']):
+                self._write(collection, batch, options['upsert'])
+                self._report_progress()
+
+        # Las escrituras directas no pasan por las señales del modelo
+        rebuild_year_stats()
+        bump_collection_version()
+        get_book_cache().invalidate_all()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Se importaron {self.valid_rows} libros '
+            f'({self.invalid_rows} filas inválidas) en {time.monotonic() - self.started:.1f}s'
+        ))
+
+    def _read_rows(self, path, input_format):
+        input_format = input_format or FORMATS.get(path.suffix.lower())
+        if input_format is None:
+            raise CommandError(f'No se reconoce el formato de {path}; use --format')
+        if not path.exists():
+            raise CommandError(f'No existe el archivo {path}')
+
+        with path.open(encoding='utf-8', newline='') as file:
+            if input_format == 'csv':
+                # La línea 1 es la cabecera
+                yield from enumerate(csv.DictReader(file), start=2)
+                return
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as error:
+                    yield line_number, error
+
+    def _validate(self, path, rows):
+        child = BookSerializer(many=True).child
+        for line_number, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise serializers.ValidationError({'non_field_errors': [str(row)]})
+                document = book_validated_data_to_document(child.run_validation(row))
+            except serializers.ValidationError as error:
+                self.invalid_rows += 1
+                if self.invalid_rows <= self.max_errors:
+                    self.stderr.write(f'{path}:{line_number}: {json.dumps(error.detail, ensure_ascii=False)}')
+                continue
+            self.valid_rows += 1
+            yield document
+
+    def _batches(self, documents, batch_size):
+        documents = iter(documents)
+        while batch := list(islice(documents, batch_size)):
+            yield batch
+
+    def _write(self, collection, batch, upsert):
+        now = timezone.now()
+        if upsert:
+            # bulk_write desordenado con dos upserts del mismo título y autor insertaría dos libros:
+            # se queda la última fila, como si se aplicaran en orden
+            batch = list({(document['title'], document['author']): document for document in batch}.values())
+        ids = reserve_book_ids(len(batch))
+        if not upsert:
+            requests = [
+                InsertOne({**document, 'id': pk, 'created_at': now, 'updated_at': now})
+                for pk, document in zip(ids, batch)
+            ]
+        else:
+            # Los ids reservados para libros que ya existían quedan sin usar
+            requests = [
+                UpdateOne(
+                    {'title': document['title'], 'author': document['author']},
+                    {
+                        '$set': {**document, 'updated_at': now},
+                        '$setOnInsert': {'id': pk, 'created_at': now},
+                    },
+                    upsert=True,
+                )
+                for pk, document in zip(ids, batch)
+            ]
+        collection.bulk_write(requests, ordered=False)
+
+    def _report_progress(self):
+        now = time.monotonic()
+        if now - self.last_report < PROGRESS_INTERVAL:
+            return
+        self.last_report = now
+        elapsed = now - self.started
+        rate = self.valid_rows / elapsed if elapsed else 0
+        self.stdout.write(f'{self.valid_rows} filas importadas ({rate:,.0f} filas/s)')
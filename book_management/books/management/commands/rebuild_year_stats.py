@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from books.utils.stats import inconsistent_years, rebuild_year_stats, year_stats_is_empty
+
+
+class Command(BaseCommand):
+    help = 'Recalcula desde cero la colección materializada book_year_stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Solo compara las estadísticas materializadas con las calculadas, sin escribir',
+        )
+        parser.add_argument(
+            '--if-empty',
+            action='store_true',
+            help='Reconstruye solo si book_year_stats está vacía',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            years = inconsistent_years()
+            if years:
+                raise CommandError(
+                    f'Estadísticas inconsistentes para los años: {", ".join(map(str, years))}'
+                )
+            self.stdout.write(self.style.SUCCESS('Las estadísticas por año son consistentes'))
+            return
+
+        if options['if_empty'] and not year_stats_is_empty():
+            self.stdout.write('book_year_stats ya contiene datos, no se reconstruye')
+            return
+
+        rebuild_year_stats()
+        self.stdout.write(self.style.SUCCESS('Se reconstruyeron las estadísticas por año'))
@@ -0,0 +1,124 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .utils.metrics import RequestStats, current_request_stats, registry
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que también funciona en modo async.
+
+    WhiteNoise solo es síncrono: bajo ASGI Django lo ejecutaría con sync_to_async
+    en un único hilo compartido y atendería las peticiones de a una por worker.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+HTTP_METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+
+class RequestMetricsMiddleware:
+    """
+    Mide cada petición: latencia, consultas del ORM, comandos de MongoDB y bytes
+    de respuesta, agrupados por nombre de URL (ver /metrics). Además devuelve
+    los tiempos al cliente en la cabecera Server-Timing.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        return self._finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        # sync_to_async copia el contexto, así que el ORM en hilos también suma aquí
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_stats.reset(token)
+        return self._finish(request, response, stats, started)
+
+    def _finish(self, request, response, stats, started):
+        elapsed = time.perf_counter() - started
+        response['Server-Timing'] = (
+            f'app;dur={elapsed * 1000:.1f}, '
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.db_queries} queries", '
+            f'mongo;dur={stats.mongo_time * 1000:.1f};desc="{stats.mongo_commands} commands"'
+        )
+        match = getattr(request, 'resolver_match', None)
+        view = match.url_name if match is not None and match.url_name else 'unmatched'
+        # Las etiquetas no pueden depender de valores arbitrarios del cliente
+        method = request.method if request.method in HTTP_METHODS else 'other'
+
+        def observe(response_bytes):
+            registry.observe(
+                view, method, response.status_code,
+                time.perf_counter() - started, response_bytes, stats,
+            )
+
+        if response.streaming:
+            # La exportación se mide hasta enviar el último fragmento
+            response.streaming_content = self._count_streamed(
+                response.streaming_content, stats, observe
+            )
+        else:
+            observe(len(response.content))
+        return response
+
+    @staticmethod
+    def _count_streamed(content, stats, observe):
+        # Los lotes del cursor se leen mientras se envía la respuesta
+        content = iter(content)
+        size = 0
+        try:
+            while True:
+                token = current_request_stats.set(stats)
+                try:
+                    chunk = next(content)
+                except StopIteration:
+                    break
+                finally:
+                    current_request_stats.reset(token)
+                size += len(chunk)
+                yield chunk
+        finally:
+            observe(size)
@@ -13,6 +13,19 @@ class Book(models.Model):
     class Meta:
         db_table = 'books'
         managed = True
+        # djongo no crea estos índices: se aplican con `manage.py ensure_indexes`
+        indexes = [
+            # (campo, id) para cada ORDERING_FIELDS: el listado ordena y pagina por keyset sobre
+            # ese par. También sirven a los filtros de igualdad y rango sobre el campo
+            models.Index(fields=['created_at', 'id'], name='books_created_at_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='books_updated_at_id_idx'),
+            models.Index(fields=['published_date', 'id'], name='books_published_date_id_idx'),
+            models.Index(fields=['price', 'id'], name='books_price_id_idx'),
+            models.Index(fields=['title', 'id'], name='books_title_id_idx'),
+            models.Index(fields=['author', 'id'], name='books_author_id_idx'),
+            models.Index(fields=['genre', 'id'], name='books_genre_id_idx'),
+            models.Index(fields=['title', 'author'], name='books_title_author_idx'),
+        ]
 
     def __str__(self):
         return self.title
\ No newline at end of file
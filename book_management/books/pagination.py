@@ -0,0 +1,119 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .models import Book
+
+
+class BookCursorPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre (campo de orden, id).
+
+    Cada página filtra por la posición del último libro visto en lugar de saltar
+    documentos con skip/offset, así que cualquier página cuesta lo mismo que la primera.
+    """
+    cursor_query_param = 'cursor'
+    page_size = settings.BOOKS_PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = settings.BOOKS_MAX_PAGE_SIZE
+    ordering = 'created_at'
+    invalid_cursor_message = CursorPagination.invalid_cursor_message
+
+    def paginate_books(self, repository, filters, request, view=None, ordering=None, fields=None):
+        list_kwargs = self._start_page(request, ordering)
+        return self._finish_page(repository.list(filters, fields=fields, **list_kwargs))
+
+    async def async_paginate_books(self, repository, filters, request, view=None, ordering=None,
+                                   fields=None):
+        list_kwargs = self._start_page(request, ordering)
+        return self._finish_page(await repository.list(filters, fields=fields, **list_kwargs))
+
+    def _start_page(self, request, ordering):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = ordering or self.ordering
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        self.field = self.ordering.lstrip('-')
+        self.reverse = self.cursor is not None and self.cursor['reverse']
+        # Al retroceder se recorre el índice en sentido contrario
+        descending = self.ordering.startswith('-') != self.reverse
+        return {
+            'ordering': f'-{self.field}' if descending else self.field,
+            'position': self.cursor['position'] if self.cursor is not None else None,
+            'limit': self.page_size + 1,
+        }
+
+    def _finish_page(self, results):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if self.reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            value, pk = cursor['p']
+            reverse = bool(cursor['r'])
+            ordering = cursor['o']
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if ordering != self.ordering:
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            # El valor viaja como texto; se vuelve al tipo del campo para compararlo en MongoDB
+            value = Book._meta.get_field(ordering.lstrip('-')).to_python(value)
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        return {'position': (value, pk), 'reverse': reverse}
+
+    def encode_cursor(self, book, reverse):
+        cursor = {
+            'p': [str(book[self.field]), book['id']],
+            'r': reverse,
+            'o': self.ordering,
+        }
+        encoded = b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -0,0 +1,10 @@
+from rest_framework.permissions import BasePermission
+
+from .authentication import METRICS_SCRAPER
+
+
+class IsMetricsScraper(BasePermission):
+    """Peticiones autenticadas con BOOKS_METRICS_TOKEN (MetricsTokenAuthentication)."""
+
+    def has_permission(self, request, view):
+        return request.auth is METRICS_SCRAPER
@@ -0,0 +1,203 @@
+from datetime import date, datetime, time, timezone as dt_timezone
+
+from bson import ObjectId
+from django.utils import timezone
+from pymongo import ASCENDING, DESCENDING
+
+from .filters import books_mongo_query
+from .models import Book
+from .utils.mongo_connection import AsyncMongoDBConnection, MongoDBConnection
+from .utils.stats import (
+    YEAR_STATS_COLLECTION,
+    facet_stats,
+    format_materialized_stats,
+    price_distribution,
+    materialized_year_query,
+    materialized_year_range_stats,
+    materialized_year_stats,
+    year_stats,
+)
+
+
+def _to_python(document):
+    # Mismos tipos que devuelve el ORM: date para published_date y datetime con zona UTC
+    book = {}
+    for field, value in document.items():
+        if field == '_id':
+            continue
+        if isinstance(value, datetime):
+            if field == 'published_date':
+                value = value.date()
+            elif timezone.is_naive(value):
+                value = timezone.make_aware(value, dt_timezone.utc)
+        book[field] = value
+    if book.get('id') is None and '_id' in document:
+        # Libros insertados fuera de djongo sin id numérico
+        book['id'] = str(document['_id'])
+    return book
+
+
+def _to_mongo(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.make_naive(value, dt_timezone.utc)
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, time.min)
+    return value
+
+
+def _projection(fields):
+    if fields is None:
+        return None
+    return {field: 1 for field in ('id', *fields)}
+
+
+def _pk_query(pk):
+    if isinstance(pk, int) or str(pk).isdigit():
+        return {'id': int(pk)}
+    if ObjectId.is_valid(pk):
+        return {'_id': ObjectId(pk)}
+    return None
+
+
+def _list_query(filters, ordering, position, fields):
+    """Consulta, proyección y orden de `list`, compartidos por el repositorio sync y el async."""
+    field = ordering.lstrip('-')
+    direction = DESCENDING if ordering.startswith('-') else ASCENDING
+    query = books_mongo_query(filters or {})
+
+    if position is not None:
+        value, pk = position
+        value = _to_mongo(value)
+        operator = '$lt' if direction == DESCENDING else '$gt'
+        keyset = {'$or': [
+            {field: {operator: value}},
+            {field: value, 'id': {operator: pk}},
+        ]}
+        query = {'$and': [query, keyset]} if query else keyset
+
+    if fields is not None and field not in fields:
+        fields = [*fields, field]
+    return query, _projection(fields), [(field, direction), ('id', direction)]
+
+
+class BookRepository:
+    """
+    Lecturas de libros directamente sobre la colección de MongoDB.
+
+    Evita la traducción ORM → SQL → djongo de cada consulta. Devuelve dicts con
+    los mismos tipos que el modelo; las escrituras siguen pasando por el ORM.
+    """
+
+    def __init__(self, collection=None):
+        self.collection = collection or MongoDBConnection.get_instance().get_collection(
+            Book._meta.db_table
+        )
+
+    def get(self, pk, fields=None):
+        query = _pk_query(pk)
+        if query is None:
+            return None
+        document = self.collection.find_one(query, _projection(fields))
+        return _to_python(document) if document is not None else None
+
+    def get_many(self, pks, fields=None):
+        """
+        Libros de `pks` con una sola consulta $in, en un dict indexado por el id
+        pedido; los que no existen (o no son ids válidos) no aparecen.
+        """
+        queries = {pk: _pk_query(pk) for pk in pks}
+        clauses = []
+        for field in ('id', '_id'):
+            values = [query[field] for query in queries.values() if query and field in query]
+            if values:
+                clauses.append({field: {'$in': values}})
+        if not clauses:
+            return {}
+
+        found = {}
+        cursor = self.collection.find(clauses[0] if len(clauses) == 1 else {'$or': clauses}, _projection(fields))
+        for document in cursor:
+            book = _to_python(document)
+            found['id', document.get('id')] = book
+            found['_id', document['_id']] = book
+        books = {}
+        for pk, query in queries.items():
+            if query is not None:
+                (field, value), = query.items()
+                if (field, value) in found:
+                    books[pk] = found[field, value]
+        return books
+
+    def list(self, filters=None, ordering='created_at', position=None, limit=None, fields=None):
+        """
+        Libros filtrados y ordenados por (campo de `ordering`, id).
+
+        `position` es el (valor, id) del último libro visto: solo se devuelven los
+        que van después en ese orden, para paginar por keyset sin skip.
+        """
+        query, projection, sort = _list_query(filters, ordering, position, fields)
+        cursor = self.collection.find(query, projection).sort(sort)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [_to_python(document) for document in cursor]
+
+    def changed(self, after, until, limit):
+        """
+        Libros creados o modificados en orden (updated_at, id), hasta `until` inclusive.
+
+        `after` es el (updated_at, id) del último cambio entregado; con id None
+        se excluyen todos los de ese updated_at, y con after None se empieza desde el principio.
+        """
+        query = {'updated_at': {'$lte': _to_mongo(until)}}
+        if after is not None:
+            updated_at, pk = after
+            keyset = {'updated_at': {'$gt': _to_mongo(updated_at)}}
+            if pk is not None:
+                keyset = {'$or': [keyset, {'updated_at': _to_mongo(updated_at), 'id': {'$gt': pk}}]}
+            query = {'$and': [query, keyset]}
+        cursor = self.collection.find(query).sort([('updated_at', ASCENDING), ('id', ASCENDING)]).limit(limit)
+        return [_to_python(document) for document in cursor]
+
+    def year_stats(self, year):
+        return materialized_year_stats(year)
+
+    def computed_year_stats(self, year):
+        return year_stats(year)
+
+    def year_range_stats(self, start_year, end_year):
+        return materialized_year_range_stats(start_year, end_year)
+
+    def facet_stats(self, filters=None, limit=10):
+        return facet_stats(books_mongo_query(filters or {}), limit)
+
+    def price_distribution(self, year=None, genre=None, author=None, bins=10, percentiles=()):
+        return price_distribution(year, genre, author, bins, percentiles)
+
+
+class AsyncBookRepository:
+    """Las mismas lecturas que BookRepository con motor, para las vistas async."""
+
+    def __init__(self, connection=None):
+        connection = connection or AsyncMongoDBConnection.get_instance()
+        self.collection = connection.get_collection(Book._meta.db_table)
+        self.year_stats_collection = connection.get_collection(YEAR_STATS_COLLECTION)
+
+    async def get(self, pk, fields=None):
+        query = _pk_query(pk)
+        if query is None:
+            return None
+        document = await self.collection.find_one(query, _projection(fields))
+        return _to_python(document) if document is not None else None
+
+    async def list(self, filters=None, ordering='created_at', position=None, limit=None, fields=None):
+        query, projection, sort = _list_query(filters, ordering, position, fields)
+        cursor = self.collection.find(query, projection).sort(sort)
+        if limit is not None:
+            cursor = cursor.limit(limit)
+        return [_to_python(document) async for document in cursor]
+
+    async def year_stats(self, year):
+        document = await self.year_stats_collection.find_one(materialized_year_query(year))
+        return format_materialized_stats(document) if document is not None else None
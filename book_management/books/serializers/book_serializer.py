@@ -1,6 +1,8 @@
 from rest_framework import serializers
-from datetime import datetime
+from datetime import date, datetime, time, timezone as dt_timezone
+from functools import lru_cache
 from django.contrib.auth.models import User
+from django.db import models
 from ..models import Book
 
 class UserSerializer(serializers.ModelSerializer):
@@ -29,4 +31,81 @@ class BookSerializer(serializers.ModelSerializer):
     class Meta:
         model = Book
         fields = ['id', 'title', 'author', 'published_date', 'genre', 'price', 'created_at', 'updated_at']
-        read_only_fields = ['created_at', 'updated_at']
\ No newline at end of file
+        read_only_fields = ['created_at', 'updated_at']
+
+def _date_representation(value):
+    # djongo guarda los DateField como datetime a medianoche
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.isoformat()
+
+
+def datetime_representation(value):
+    # Mismo formato que DateTimeField de DRF: hora UTC terminada en 'Z'.
+    # Los documentos crudos de MongoDB traen datetimes naive en UTC
+    if value.tzinfo is not None:
+        value = value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+    return value.isoformat() + 'Z'
+
+
+def _converter(field_name):
+    model_field = Book._meta.get_field(field_name)
+    if isinstance(model_field, models.DateTimeField):
+        return datetime_representation
+    if isinstance(model_field, models.DateField):
+        return _date_representation
+    if isinstance(model_field, models.FloatField):
+        return float
+    return None
+
+
+@lru_cache(maxsize=None)
+def _converters(fields):
+    return tuple((field, _converter(field)) for field in fields)
+
+
+class BookReadSerializer:
+    """
+    Serializador de solo lectura con la misma salida que BookSerializer.
+
+    Trabaja sobre dicts (BookRepository, `values()` o documentos crudos) con un
+    conversor por campo calculado una sola vez, en lugar de recorrer los campos
+    de DRF para cada libro. BookSerializer se sigue usando para validar escrituras.
+    """
+    fields = tuple(BookSerializer.Meta.fields)
+
+    def __init__(self, instance=None, many=False, fields=None):
+        self.instance = instance
+        self.many = many
+        if fields is not None:
+            # Subconjunto de campos (?fields= / ?exclude=), en el orden de `fields`
+            self.fields = tuple(fields)
+        self.converters = _converters(self.fields)
+
+    def to_representation(self, book):
+        representation = {}
+        for field, convert in self.converters:
+            value = book.get(field)
+            if value is not None and convert is not None:
+                value = convert(value)
+            representation[field] = value
+        if 'id' in representation and representation['id'] is None and '_id' in book:
+            # Documentos insertados fuera de djongo sin id numérico
+            representation['id'] = str(book['_id'])
+        return representation
+
+    @property
+    def data(self):
+        if self.many:
+            to_representation = self.to_representation
+            return [to_representation(book) for book in self.instance]
+        return self.to_representation(self.instance)
+
+
+def book_validated_data_to_document(validated_data):
+    """Convierte los datos validados por BookSerializer al formato en que djongo guarda un libro."""
+    document = dict(validated_data)
+    published_date = document.get('published_date')
+    if isinstance(published_date, date) and not isinstance(published_date, datetime):
+        document['published_date'] = datetime.combine(published_date, time.min)
+    return document
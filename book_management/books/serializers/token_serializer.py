@@ -0,0 +1,14 @@
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+# Claims que ClaimsUser lee sin consultar la base de datos
+USER_CLAIMS = ('username', 'is_staff', 'is_superuser')
+
+
+class BookTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # El access token se genera a partir del refresh y hereda estos claims
+        token = super().get_token(user)
+        for claim in USER_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
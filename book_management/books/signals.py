@@ -0,0 +1,91 @@
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import get_token_cache
+from .models import Book
+from .utils import stats
+from .utils.book_cache import get_book_cache
+from .utils.changes import record_tombstones
+from .utils.metrics import record_db_query
+from .utils.conditional import bump_collection_version
+
+
+def _year_stats_key(book):
+    return book.published_date.year, book.price
+
+
+@receiver(post_init, sender=Book)
+def remember_year_stats_key(sender, instance, **kwargs):
+    # Guardamos año y precio originales para mover el libro de año en un PUT
+    loaded = 'published_date' in instance.__dict__ and 'price' in instance.__dict__
+    if instance.pk is not None and loaded:
+        instance._year_stats_key = _year_stats_key(instance)
+    else:
+        instance._year_stats_key = None
+
+
+@receiver(post_save, sender=Book)
+def update_year_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    key = _year_stats_key(instance)
+    previous = instance._year_stats_key
+    if previous == key:
+        return
+    stats.apply_year_stats_changes(
+        added=[key],
+        removed=[previous] if previous is not None else [],
+    )
+    instance._year_stats_key = key
+
+
+@receiver(post_delete, sender=Book)
+def update_year_stats_on_delete(sender, instance, **kwargs):
+    stats.apply_year_stats_changes(
+        removed=[instance._year_stats_key or _year_stats_key(instance)],
+    )
+
+
+@receiver(post_delete, sender=Book)
+def record_book_tombstone(sender, instance, **kwargs):
+    record_tombstones([instance.pk])
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_cached_book(sender, instance, **kwargs):
+    # PUT y DELETE de BookDetailView pasan por aquí
+    get_book_cache().invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def bump_books_version(sender, raw=False, **kwargs):
+    # Invalida los ETag de listados y estadísticas
+    if not raw:
+        bump_collection_version()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_cached_token(sender, instance, **kwargs):
+    get_token_cache().invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, created=False, raw=False, **kwargs):
+    # Un usuario desactivado o modificado no debe seguir autenticándose desde la caché
+    if created or raw:
+        return
+    cache = get_token_cache()
+    for key in Token.objects.filter(user=instance).values_list('key', flat=True):
+        cache.invalidate(key)
+
+
+@receiver(connection_created)
+def install_query_metrics(sender, connection, **kwargs):
+    # Cada hilo tiene su propia conexión y se reconecta tras CONN_MAX_AGE
+    if record_db_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_db_query)
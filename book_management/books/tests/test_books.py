@@ -1,10 +1,33 @@
+import csv
+import io
+import json
+import msgpack
 import pytest
-from rest_framework.test import APIClient
+import threading
+from asgiref.sync import async_to_sync
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
 from django.contrib.auth.models import User
-from datetime import datetime
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from datetime import datetime, timedelta, timezone as dt_timezone
+from rest_framework.authtoken.models import Token
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.tokens import AccessToken
+from ..authentication import TokenCache, get_token_cache
+from ..async_views import AsyncBookDetailView, AsyncBookListCreateView, AsyncBookYearStatsView
 from ..models import Book
+from ..renderers import MessagePackRenderer, ORJSONRenderer
+from ..repository import BookRepository
+from ..serializers.book_serializer import BookReadSerializer, BookSerializer
+from ..utils import changes, metrics, snapshot
+from ..utils.book_cache import BookDetailCache, get_book_cache, reset_book_cache
+from ..utils.changes import TOMBSTONES_COLLECTION
+from ..utils.conditional import VERSIONS_COLLECTION
 from ..utils.mongo_connection import MongoDBConnection
+from ..utils.stats import YEAR_STATS_COLLECTION
 from bson import ObjectId
 
 @pytest.fixture
@@ -28,7 +51,11 @@ def auth_client(api_client, test_user):
 def mongo_connection():
     connection = MongoDBConnection.get_instance()
     # Limpiar la colección antes de cada test
-    connection.get_collection(Book.collection_name).delete_many({})
+    connection.get_collection(Book._meta.db_table).delete_many({})
+    connection.get_collection(YEAR_STATS_COLLECTION).delete_many({})
+    connection.get_collection(VERSIONS_COLLECTION).delete_many({})
+    connection.get_collection(TOMBSTONES_COLLECTION).delete_many({})
+    get_book_cache().invalidate_all()
     return connection
 
 @pytest.fixture
@@ -49,14 +76,14 @@ class TestBookAPI:
         assert response.data['title'] == sample_book['title']
         
         # Verificar en MongoDB
-        book_collection = mongo_connection.get_collection(Book.collection_name)
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
         saved_book = book_collection.find_one({'title': sample_book['title']})
         assert saved_book is not None
         assert saved_book['author'] == sample_book['author']
 
     def test_list_books(self, auth_client, mongo_connection, sample_book):
         # Crear un libro primero
-        book_collection = mongo_connection.get_collection(Book.collection_name)
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
         book_collection.insert_one({
             **sample_book,
             'published_date': datetime.strptime(sample_book['published_date'], '%Y-%m-%d'),
@@ -65,12 +92,199 @@ class TestBookAPI:
 
         response = auth_client.get('/api/books/')
         assert response.status_code == status.HTTP_200_OK
-        assert len(response.data) == 1
-        assert response.data[0]['title'] == sample_book['title']
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['title'] == sample_book['title']
+        assert response.data['next'] is None
+
+    def test_list_books_cursor_pagination(self, auth_client, mongo_connection, sample_book):
+        for i in range(5):
+            auth_client.post('/api/books/', {**sample_book, 'title': f'Book {i}'}, format='json')
+
+        response = auth_client.get('/api/books/', {'page_size': 2})
+        assert response.status_code == status.HTTP_200_OK
+        titles = [book['title'] for book in response.data['results']]
+        assert titles == ['Book 0', 'Book 1']
+        assert response.data['previous'] is None
+
+        while response.data['next']:
+            response = auth_client.get(response.data['next'])
+            titles += [book['title'] for book in response.data['results']]
+        assert titles == [f'Book {i}' for i in range(5)]
+
+        response = auth_client.get(response.data['previous'])
+        assert [book['title'] for book in response.data['results']] == ['Book 2', 'Book 3']
+
+    def test_list_books_filters_and_ordering(self, auth_client, mongo_connection, sample_book):
+        for title, author, price, published_date in [
+            ('A', 'Borges', 10.00, '1944-01-01'),
+            ('B', 'Borges', 30.00, '1949-01-01'),
+            ('C', 'Cortázar', 20.00, '1963-01-01'),
+            ('D', 'Borges', 20.00, '1975-01-01'),
+        ]:
+            auth_client.post('/api/books/', {
+                **sample_book,
+                'title': title,
+                'author': author,
+                'price': price,
+                'published_date': published_date
+            }, format='json')
+
+        response = auth_client.get('/api/books/', {
+            'author': 'Borges',
+            'price_min': 15,
+            'published_before': '1980-01-01',
+            'ordering': '-price',
+            'page_size': 1
+        })
+        assert response.status_code == status.HTTP_200_OK
+        titles = [book['title'] for book in response.data['results']]
+        while response.data['next']:
+            response = auth_client.get(response.data['next'])
+            titles += [book['title'] for book in response.data['results']]
+        assert titles == ['B', 'D']
+
+        response = auth_client.get('/api/books/export/', {'published_after': '1960-01-01'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert sorted(json.loads(line)['title'] for line in lines) == ['C', 'D']
+
+    def test_sparse_fieldsets(self, auth_client, mongo_connection, sample_book):
+        book = auth_client.post('/api/books/', sample_book, format='json').data
+
+        response = auth_client.get('/api/books/', {'fields': 'price,id,title'})
+        assert response.data['results'] == [{'id': book['id'], 'title': 'Test Book', 'price': 29.99}]
+
+        response = auth_client.get(f"/api/books/{book['id']}/", {'exclude': 'created_at,updated_at'})
+        assert list(response.data) == ['id', 'title', 'author', 'published_date', 'genre', 'price']
+        assert response['ETag'] != auth_client.get(f"/api/books/{book['id']}/")['ETag']
+
+        response = auth_client.get('/api/books/export/', {'fields': 'id,price', 'format': 'csv'})
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert rows == [['id', 'price'], [str(book['id']), '29.99']]
+
+        response = auth_client.get('/api/books/', {'fields': 'title,isbn'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'fields' in response.data
+
+    def test_list_books_rejects_unindexed_ordering(self, auth_client):
+        response = auth_client.get('/api/books/', {'ordering': 'updated_at'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'ordering' in response.data
+
+    def test_export_books(self, auth_client, mongo_connection, sample_book):
+        for i in range(3):
+            auth_client.post('/api/books/', {**sample_book, 'title': f'Book {i}'}, format='json')
+
+        response = auth_client.get('/api/books/export/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        assert [json.loads(line)['title'] for line in lines] == ['Book 0', 'Book 1', 'Book 2']
+
+        response = auth_client.get('/api/books/export/', {'format': 'csv'})
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        assert len(rows) == 3
+        assert rows[0]['author'] == sample_book['author']
+
+    def test_json_and_msgpack_renderers(self, auth_client, mongo_connection, sample_book):
+        response = auth_client.post(
+            '/api/books/', msgpack.packb(sample_book), content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack'
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response['Content-Type'] == 'application/msgpack'
+        created = msgpack.unpackb(response.content)
+        assert created['title'] == sample_book['title']
+
+        response = auth_client.get(f'/api/books/{created["id"]}/')
+        assert response['Content-Type'] == 'application/json'
+        assert json.loads(response.content) == response.data
+        assert response.data['title'] == created['title']
+
+        response = auth_client.post('/api/books/', b'{"title": ', content_type='application/json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # Fechas fuera de los serializadores (deleted_at, date_joined) con el formato de DRF
+        data = {'at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc), 'naive': datetime(2024, 5, 1)}
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        assert msgpack.unpackb(MessagePackRenderer().render(data)) == json.loads(JSONRenderer().render(data))
+
+    def test_bulk_operations(self, auth_client, mongo_connection, sample_book):
+        existing = auth_client.post('/api/books/', sample_book, format='json').data
+        operations = [
+            {'op': 'create', 'data': {**sample_book, 'title': 'Bulk 1'}},
+            {'op': 'create', 'data': {**sample_book, 'title': 'Bulk 2'}},
+            {'op': 'update', 'id': existing['id'], 'data': {**sample_book, 'title': 'Updated'}},
+        ]
+
+        response = auth_client.post('/api/books/bulk/', {'operations': operations}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['summary'] == {'created': 2, 'updated': 1}
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
+        assert book_collection.count_documents({}) == 3
+        assert book_collection.find_one({'id': existing['id']})['title'] == 'Updated'
+
+        response = auth_client.get('/api/books/stats/year/2023/')
+        assert response.data['total_books'] == 3
+
+    def test_bulk_operations_ordered_and_unordered(self, auth_client, mongo_connection, sample_book):
+        operations = [
+            {'op': 'create', 'data': sample_book},
+            {'op': 'create', 'data': {**sample_book, 'price': 'not a price'}},
+            {'op': 'delete', 'id': 999999},
+        ]
+
+        response = auth_client.post('/api/books/bulk/', {'operations': operations}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert [result['status'] for result in response.data['results']] == ['skipped', 'invalid', 'not_found']
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
+        assert book_collection.count_documents({}) == 0
+
+        response = auth_client.post('/api/books/bulk/', {
+            'operations': operations,
+            'ordered': False
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert [result['status'] for result in response.data['results']] == ['created', 'invalid', 'not_found']
+        assert book_collection.count_documents({}) == 1
+
+    def test_import_books_command(self, mongo_connection, tmp_path):
+        source = tmp_path / 'books.csv'
+        source.write_text(
+            'title,author,published_date,genre,price\n'
+            'Rayuela,Julio Cortázar,1963-06-28,Novela,22.99\n'
+            'Sin autor,,1963-06-28,Novela,10\n',
+            encoding='utf-8'
+        )
+        call_command('import_books', str(source))
+        call_command('import_books', str(source), '--upsert')
+
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
+        assert book_collection.count_documents({}) == 1
+        assert Book.objects.get(title='Rayuela').author == 'Julio Cortázar'
+
+        # Filas repetidas en el mismo lote: una sola alta, con los datos de la última
+        source.write_text(
+            'title,author,published_date,genre,price\n'
+            'Ficciones,Jorge Luis Borges,1944-01-01,Cuento,15\n'
+            'Ficciones,Jorge Luis Borges,1944-01-01,Cuento,18\n',
+            encoding='utf-8'
+        )
+        call_command('import_books', str(source), '--upsert')
+        assert book_collection.count_documents({'title': 'Ficciones'}) == 1
+        assert book_collection.find_one({'title': 'Ficciones'})['price'] == 18
+
+    def test_ensure_indexes_command(self, mongo_connection):
+        call_command('ensure_indexes')
+        call_command('ensure_indexes', '--check')
+
+        indexes = mongo_connection.get_collection(Book._meta.db_table).index_information()
+        assert indexes['books_published_date_id_idx']['key'] == [('published_date', 1), ('id', 1)]
+        assert indexes['books_created_at_id_idx']['key'] == [('created_at', 1), ('id', 1)]
 
     def test_retrieve_book(self, auth_client, mongo_connection, sample_book):
         # Crear un libro
-        book_collection = mongo_connection.get_collection(Book.collection_name)
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
         book_id = ObjectId()
         book_collection.insert_one({
             **sample_book,
@@ -82,9 +296,229 @@ class TestBookAPI:
         assert response.status_code == status.HTTP_200_OK
         assert response.data['title'] == sample_book['title']
 
+    def test_batch_retrieve_books(self, auth_client, mongo_connection, sample_book, settings):
+        first = auth_client.post('/api/books/', {**sample_book, 'title': 'First'}, format='json').data
+        second = auth_client.post('/api/books/', {**sample_book, 'title': 'Second'}, format='json').data
+
+        response = auth_client.get(f'/api/books/batch/?ids={second["id"]},999999,{first["id"]},{second["id"]}&fields=title')
+        assert response.status_code == status.HTTP_200_OK
+        assert [book['title'] for book in response.data['results']] == ['Second', 'First']
+        assert response.data['missing'] == ['999999']
+
+        response = auth_client.post('/api/books/batch/', {'ids': [first['id'], 'not-an-id']}, format='json')
+        assert [book['id'] for book in response.data['results']] == [first['id']]
+        assert response.data['missing'] == ['not-an-id']
+
+        settings.BOOKS_BATCH_MAX_IDS = 1
+        response = auth_client.get(f'/api/books/batch/?ids={first["id"]},{second["id"]}')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_book_detail_cache(self, auth_client, mongo_connection, sample_book, settings, tmp_path, monkeypatch):
+        # Una caché por proceso no puede invalidar en los demás workers
+        assert not BookDetailCache(10, 60, 'default').enabled
+
+        # Sin caché ?fields= sigue siendo una proyección de MongoDB
+        book = auth_client.post('/api/books/', sample_book, format='json').data
+        projections = []
+        get = BookRepository.get
+        with monkeypatch.context() as patch:
+            patch.setattr(BookRepository, 'get', lambda self, pk, fields=None: (
+                projections.append(fields) or get(self, pk, fields)
+            ))
+            response = auth_client.get(f'/api/books/{book["id"]}/?fields=title')
+        assert response.data == {'title': sample_book['title']}
+        assert projections == [['title', 'updated_at']]
+
+        settings.CACHES = {
+            **settings.CACHES,
+            'books': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': str(tmp_path),
+            },
+        }
+        settings.BOOKS_DETAIL_CACHE_ALIAS = 'books'
+        reset_book_cache()
+        try:
+            book = auth_client.post('/api/books/', sample_book, format='json').data
+            cache = get_book_cache()
+            # Otro worker: su propio LRU sobre la misma caché compartida
+            other_worker = BookDetailCache(10, 60, 'books')
+
+            hits = cache.local_hits
+            assert auth_client.get(f'/api/books/{book["id"]}/').data['title'] == sample_book['title']
+            response = auth_client.get(f'/api/books/{book["id"]}/?fields=title')
+            assert response.data == {'title': sample_book['title']}
+            assert cache.local_hits == hits + 1
+            assert other_worker.get(book['id'])[1] is not None
+            assert other_worker.shared_hits == 1
+
+            auth_client.put(f'/api/books/{book["id"]}/', {**sample_book, 'title': 'Updated'}, format='json')
+            assert other_worker.get(book['id'])[1] is None
+            assert auth_client.get(f'/api/books/{book["id"]}/').data['title'] == 'Updated'
+
+            operations = [{'op': 'delete', 'id': book['id']}]
+            auth_client.post('/api/books/bulk/', {'operations': operations}, format='json')
+            assert auth_client.get(f'/api/books/{book["id"]}/').status_code == status.HTTP_404_NOT_FOUND
+        finally:
+            reset_book_cache()
+
+    def test_repository_matches_orm(self, auth_client, mongo_connection, sample_book):
+        book = auth_client.post('/api/books/', sample_book, format='json').data
+        repository = BookRepository()
+
+        document = repository.get(book['id'])
+        assert BookReadSerializer(document).data == BookSerializer(
+            Book.objects.get(pk=book['id'])
+        ).data
+        assert repository.get('not-an-id') is None
+        assert auth_client.get('/api/books/not-an-id/').status_code == status.HTTP_404_NOT_FOUND
+
+        books = repository.list({'author': sample_book['author']}, fields=['title'])
+        assert books == [{'id': book['id'], 'title': sample_book['title'], 'created_at': document['created_at']}]
+
+    def test_benchmark_reads_command(self, auth_client, mongo_connection, sample_book):
+        auth_client.post('/api/books/', sample_book, format='json')
+        out = io.StringIO()
+        call_command('benchmark_reads', '--iterations', '3', '--warmup', '0', stdout=out)
+        assert 'get por id' in out.getvalue()
+
+    def test_benchmark_api_compare(self, tmp_path):
+        summary = {'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0, 'rps': 100.0}
+        baseline = tmp_path / 'baseline.json'
+        baseline.write_text(json.dumps({'meta': {}, 'scenarios': {'detail': summary}}))
+        current = tmp_path / 'current.json'
+
+        current.write_text(json.dumps({'meta': {}, 'scenarios': {'detail': {**summary, 'p95_ms': 21.0}}}))
+        call_command('benchmark_api', compare=str(current), baseline=str(baseline), stderr=io.StringIO())
+
+        current.write_text(json.dumps({'meta': {}, 'scenarios': {'detail': {**summary, 'rps': 80.0}}}))
+        with pytest.raises(CommandError):
+            call_command('benchmark_api', compare=str(current), baseline=str(baseline), stderr=io.StringIO())
+
+    def test_read_serializer_matches_book_serializer(self, mongo_connection, sample_book):
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
+        book_collection.insert_one({
+            **sample_book,
+            'id': 7,
+            'published_date': datetime(2023, 1, 1),
+            'created_at': datetime(2024, 5, 6, 7, 8, 9, 123000),
+            'updated_at': datetime(2024, 5, 6, 7, 8, 9),
+        })
+        document = book_collection.find_one({'id': 7})
+
+        assert BookReadSerializer([document], many=True).data == BookSerializer(
+            Book.objects.filter(pk=7), many=True
+        ).data
+
+        out = io.StringIO()
+        call_command('benchmark_serializers', '--count', '100', '--repeat', '1', stdout=out)
+        assert 'Mejora' in out.getvalue()
+
+    def test_async_views(self, test_user, auth_client, mongo_connection, sample_book):
+        book = auth_client.post('/api/books/', sample_book, format='json').data
+        factory = APIRequestFactory()
+
+        def call(view, path, **kwargs):
+            request = factory.get(path)
+            force_authenticate(request, user=test_user)
+            response = async_to_sync(view.as_view())(request, **kwargs)
+            return response.render()
+
+        response = call(AsyncBookListCreateView, '/api/books/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == auth_client.get('/api/books/').data
+
+        response = call(AsyncBookDetailView, f"/api/books/{book['id']}/", pk=str(book['id']))
+        sync_response = auth_client.get(f"/api/books/{book['id']}/")
+        assert response.data == sync_response.data
+        assert response['ETag'] == sync_response['ETag']
+
+        response = call(AsyncBookYearStatsView, '/api/books/stats/year/2023/', year=2023)
+        assert response.data['total_books'] == 1
+
+    def test_asgi_streaming_off_event_loop(self):
+        from django.http import StreamingHttpResponse
+        from book_management.asgi import StreamingASGIHandler
+
+        threads, messages = [], []
+
+        def content():
+            for part in (b'a', b'b'):
+                threads.append(threading.get_ident())
+                yield part
+
+        async def send(message):
+            messages.append(message)
+
+        async def respond():
+            await StreamingASGIHandler().send_response(StreamingHttpResponse(content()), send)
+            return threading.get_ident()
+
+        loop_thread = async_to_sync(respond)()
+        assert [message.get('body') for message in messages] == [None, b'a', b'b', None]
+        assert messages[0]['status'] == 200
+        assert loop_thread not in threads
+
+    def test_conditional_get_and_if_match(self, auth_client, mongo_connection, sample_book):
+        book = auth_client.post('/api/books/', sample_book, format='json').data
+        url = f"/api/books/{book['id']}/"
+
+        response = auth_client.get(url)
+        etag = response['ETag']
+        assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+        assert auth_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code == status.HTTP_304_NOT_MODIFIED
+
+        list_etag = auth_client.get('/api/books/')['ETag']
+        assert auth_client.get('/api/books/', HTTP_IF_NONE_MATCH=list_etag).status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = auth_client.put(url, {**sample_book, 'title': 'Updated'}, format='json', HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != etag
+
+        # El ETag anterior ya no es válido
+        response = auth_client.put(url, sample_book, format='json', HTTP_IF_MATCH=etag)
+        assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert auth_client.delete(url, HTTP_IF_MATCH=etag).status_code == status.HTTP_412_PRECONDITION_FAILED
+        assert auth_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+        assert auth_client.get('/api/books/', HTTP_IF_NONE_MATCH=list_etag).status_code == status.HTTP_200_OK
+
+    def test_book_changes(self, auth_client, mongo_connection, sample_book, monkeypatch):
+        monkeypatch.setattr(changes, 'SETTLE_TIME', timedelta(0))
+        ids = [
+            auth_client.post('/api/books/', {**sample_book, 'title': f'Book {i}'}, format='json').data['id']
+            for i in range(3)
+        ]
+        auth_client.delete(f'/api/books/{ids[0]}/')
+
+        updated, deleted = [], []
+        response = auth_client.get('/api/books/changes/', {'page_size': 1})
+        while True:
+            assert response.status_code == status.HTTP_200_OK
+            updated += [book['id'] for book in response.data['updated']]
+            deleted += [tombstone['id'] for tombstone in response.data['deleted']]
+            if response.data['next'] is None:
+                break
+            response = auth_client.get(response.data['next'])
+        assert (updated, deleted) == (ids[1:], [ids[0]])
+
+        token = response.data['sync_token']
+        auth_client.put(f'/api/books/{ids[2]}/', {**sample_book, 'title': 'Changed'}, format='json')
+        auth_client.post('/api/books/bulk/', {'operations': [{'op': 'delete', 'id': ids[1]}]}, format='json')
+        response = auth_client.get('/api/books/changes/', {'since': token})
+        assert [book['title'] for book in response.data['updated']] == ['Changed']
+        assert [tombstone['id'] for tombstone in response.data['deleted']] == [ids[1]]
+
+        response = auth_client.get('/api/books/changes/', {'since': 'not-a-token'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        expired = changes.encode_token((datetime.now(dt_timezone.utc) - timedelta(days=365), None, changes.UPDATED))
+        response = auth_client.get('/api/books/changes/', {'since': expired})
+        assert response.status_code == status.HTTP_410_GONE
+
     def test_update_book(self, auth_client, mongo_connection, sample_book):
         # Crear un libro
-        book_collection = mongo_connection.get_collection(Book.collection_name)
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
         book_id = ObjectId()
         book_collection.insert_one({
             **sample_book,
@@ -107,7 +541,7 @@ class TestBookAPI:
 
     def test_delete_book(self, auth_client, mongo_connection, sample_book):
         # Crear un libro
-        book_collection = mongo_connection.get_collection(Book.collection_name)
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
         book_id = ObjectId()
         book_collection.insert_one({
             **sample_book,
@@ -124,25 +558,247 @@ class TestBookAPI:
 
     def test_year_stats(self, auth_client, mongo_connection, sample_book):
         # Crear varios libros del mismo año
-        book_collection = mongo_connection.get_collection(Book.collection_name)
-        books = [
-            {
+        for price, published_date in [(20.00, '2023-01-01'), (30.00, '2023-06-01')]:
+            auth_client.post('/api/books/', {
                 **sample_book,
-                'price': 20.00,
-                'published_date': datetime(2023, 1, 1)
-            },
-            {
-                **sample_book,
-                'price': 30.00,
-                'published_date': datetime(2023, 6, 1)
-            }
-        ]
-        book_collection.insert_many(books)
+                'price': price,
+                'published_date': published_date
+            }, format='json')
 
         response = auth_client.get('/api/books/stats/year/2023/')
         assert response.status_code == status.HTTP_200_OK
         assert response.data['average_price'] == 25.00
         assert response.data['total_books'] == 2
+        assert response.data['total_price'] == 50.00
+        assert response.data['price_stddev'] == 5.00
+
+        response = auth_client.get('/api/books/stats/year/2023/', {'check': 'true'})
+        assert response.data['consistent'] is True
+
+    def test_year_stats_follow_updates_and_deletes(self, auth_client, mongo_connection, sample_book):
+        first = auth_client.post('/api/books/', {**sample_book, 'price': 10.00}, format='json')
+        auth_client.post('/api/books/', {**sample_book, 'price': 30.00}, format='json')
+
+        # Mover el libro más barato a otro año
+        auth_client.put(f"/api/books/{first.data['id']}/", {
+            **sample_book,
+            'price': 10.00,
+            'published_date': '2024-03-01'
+        }, format='json')
+
+        response = auth_client.get('/api/books/stats/year/2023/')
+        assert response.data['total_books'] == 1
+        assert response.data['minimum_price'] == 30.00
+        response = auth_client.get('/api/books/stats/year/2024/')
+        assert response.data['total_books'] == 1
+
+        auth_client.delete(f"/api/books/{first.data['id']}/")
+        response = auth_client.get('/api/books/stats/year/2024/')
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_year_range_stats(self, auth_client, mongo_connection, sample_book):
+        book_collection = mongo_connection.get_collection(Book._meta.db_table)
+        book_collection.insert_many([
+            {**sample_book, 'price': 10.00, 'published_date': datetime(1999, 3, 1)},
+            {**sample_book, 'price': 20.00, 'published_date': datetime(2001, 3, 1)},
+            {**sample_book, 'price': 40.00, 'published_date': datetime(2001, 9, 1)},
+            {**sample_book, 'price': 99.00, 'published_date': datetime(2010, 1, 1)},
+        ])
+        # Los documentos insertados directamente no pasan por las señales
+        call_command('rebuild_year_stats')
+
+        response = auth_client.get('/api/books/stats/years/', {'from': 1999, 'to': 2005})
+        assert response.status_code == status.HTTP_200_OK
+        assert [bucket['year'] for bucket in response.data['years']] == [1999, 2001]
+        assert response.data['years'][1]['average_price'] == 30.00
+        assert response.data['years'][1]['maximum_price'] == 40.00
+
+        response = auth_client.get('/api/books/stats/years/', {'from': 2005, 'to': 1999})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_facet_stats(self, auth_client, mongo_connection, sample_book):
+        books = [
+            {**sample_book, 'genre': 'Novela', 'author': 'Cortázar', 'published_date': '1963-06-28', 'price': 20.0},
+            {**sample_book, 'genre': 'Novela', 'author': 'Borges', 'published_date': '1967-05-30', 'price': 30.0},
+            {**sample_book, 'genre': 'Cuento', 'author': 'Borges', 'published_date': '1944-01-01', 'price': 10.0},
+        ]
+        for book in books:
+            auth_client.post('/api/books/', book, format='json')
+
+        response = auth_client.get('/api/books/stats/facets/?limit=1')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total']['total_books'] == 3
+        assert response.data['total']['average_price'] == 20.0
+        assert [(group['genre'], group['total_books']) for group in response.data['genres']] == [('Novela', 2)]
+        assert [(group['author'], group['total_books']) for group in response.data['authors']] == [('Borges', 2)]
+        assert [(group['decade'], group['total_books']) for group in response.data['decades']] == [(1940, 1), (1960, 2)]
+
+        response = auth_client.get('/api/books/stats/facets/?author=Borges&price_min=15')
+        assert response.data['total']['total_books'] == 1
+        assert response.data['genres'][0]['maximum_price'] == 30.0
+
+        response = auth_client.get('/api/books/stats/facets/?limit=0')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_price_distribution_snapshot(self, auth_client, mongo_connection, sample_book, settings, monkeypatch):
+        for price, published_date in ((10.0, '2020-01-01'), (20.0, '2020-06-01'), (40.0, '2020-12-31'), (80.0, '2021-01-01')):
+            auth_client.post('/api/books/', {**sample_book, 'price': price, 'published_date': published_date}, format='json')
+
+        url = '/api/books/stats/price-distribution/?year=2020&bins=2&percentiles=50,90'
+        response = auth_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['total_books'] == 3
+        assert response.data['percentiles'] == {'p50': 20.0, 'p90': 36.0}
+        assert [bucket['count'] for bucket in response.data['histogram']] == [2, 1]
+        from_mongo = response.data
+
+        # Con la instantánea (si NumPy está instalado) el resultado es el mismo y sigue las escrituras
+        settings.BOOKS_COLUMNAR_SNAPSHOT = True
+        monkeypatch.setattr(changes, 'SETTLE_TIME', timedelta(0))
+        monkeypatch.setattr(snapshot, 'SETTLE_TIME', timedelta(0))
+        monkeypatch.setattr(snapshot, 'MIN_REFRESH_INTERVAL', 0)
+        snapshot.reset_snapshot()
+        try:
+            assert auth_client.get(url).data == from_mongo
+            auth_client.post('/api/books/', {**sample_book, 'price': 30.0, 'published_date': '2020-03-01'}, format='json')
+            response = auth_client.get(url)
+            assert response.data['total_books'] == 4
+            assert 'ETag' in response
+            response = auth_client.get('/api/books/stats/year/2020/')
+            assert response.data['total_books'] == 4
+            assert response.data['average_price'] == 25.0
+        finally:
+            snapshot.reset_snapshot()
+
+        response = auth_client.get('/api/books/stats/price-distribution/?percentiles=150')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_mongo_pool_stats(self, api_client, auth_client, mongo_connection):
+        response = auth_client.get('/api/monitoring/mongo-pool/')
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+        admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        api_client.force_authenticate(user=admin)
+        response = api_client.get('/api/monitoring/mongo-pool/')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['max_pool_size'] == mongo_connection.get_client().max_pool_size
+        assert response.data['checkouts'] > 0
+
+    def test_request_metrics(self, api_client, auth_client, mongo_connection, sample_book):
+        metrics.registry.reset()
+        auth_client.post('/api/books/', sample_book, format='json')
+        response = auth_client.get('/api/books/')
+        assert response.status_code == status.HTTP_200_OK
+        assert 'db;dur=' in response['Server-Timing']
+        assert 'mongo;dur=' in response['Server-Timing']
+
+        assert auth_client.get('/metrics').status_code == status.HTTP_403_FORBIDDEN
+        admin = User.objects.create_user(username='admin', password='adminpass123', is_staff=True)
+        api_client.force_authenticate(user=admin)
+        response = api_client.get('/metrics')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        body = response.content.decode()
+        assert 'books_http_requests_total{view="book-list-create",method="GET",status="200"} 1' in body
+        assert 'books_http_request_duration_seconds_count{view="book-list-create",method="POST"} 1' in body
+        assert 'books_db_queries_total{view="book-list-create",method="POST"}' in body
+
+    def test_metrics_shared_between_workers(self, api_client, settings, tmp_path):
+        settings.BOOKS_METRICS_DIR = str(tmp_path)
+        settings.BOOKS_METRICS_TOKEN = 'scrape-secret'
+        metrics.registry.reset()
+        # Otro worker con su propio archivo en el mismo directorio
+        other_worker = metrics.MetricsRegistry()
+        other_worker.observe('book-list-create', 'GET', 200, 0.01, 100, metrics.RequestStats())
+
+        api_client.credentials(HTTP_AUTHORIZATION='Bearer wrong')
+        assert api_client.get('/metrics').status_code == status.HTTP_401_UNAUTHORIZED
+        api_client.credentials(HTTP_AUTHORIZATION='Bearer scrape-secret')
+        response = api_client.get('/metrics')
+        assert response.status_code == status.HTTP_200_OK
+        body = response.content.decode()
+        assert 'books_http_requests_total{view="book-list-create",method="GET",status="200"} 1' in body
+        assert 'books_http_requests_total{view="metrics",method="GET",status="401"} 1' in body
+        metrics.registry.reset()
+
+    def test_cached_token_authentication(self, api_client, test_user):
+        cache = get_token_cache()
+        cache.clear()
+        token = Token.objects.create(user=test_user)
+        api_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        hits = cache.hits
+        assert api_client.get('/api/user/profile/').status_code == status.HTTP_200_OK
+        assert api_client.get('/api/user/profile/').status_code == status.HTTP_200_OK
+        assert cache.hits == hits + 1
+
+        test_user.is_active = False
+        test_user.save()
+        assert api_client.get('/api/user/profile/').status_code == status.HTTP_401_UNAUTHORIZED
+        test_user.is_active = True
+        test_user.save()
+
+        assert api_client.post('/api/user/logout/').status_code == status.HTTP_200_OK
+        assert api_client.get('/api/user/profile/').status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_token_cache_invalidates_other_workers(self, test_user, settings, tmp_path):
+        token = Token.objects.create(user=test_user)
+        settings.CACHES = {
+            **settings.CACHES,
+            'tokens': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': str(tmp_path),
+            },
+        }
+        worker, other_worker = TokenCache(10, 300, 'tokens'), TokenCache(10, 300, 'tokens')
+        worker.set(token.key, (test_user, token))
+        assert other_worker.get(token.key)[1] == token
+
+        worker.invalidate(token.key)
+        assert other_worker.get(token.key) is None
+
+        # Una caché por proceso no puede invalidar en los demás: solo se guarda unos segundos
+        local = TokenCache(10, 300, 'default', local_ttl=5)
+        assert local.shared is None and local.ttl == 5
+
+    def test_stateless_jwt_claims(self, api_client, test_user, django_assert_num_queries):
+        response = api_client.post('/api/token/pair/', {
+            'username': 'testuser',
+            'password': 'testpass123'
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        access = AccessToken(response.data['access'])
+        assert access['username'] == 'testuser'
+        assert access['is_staff'] is False
+
+        request = APIRequestFactory().get('/api/books/', HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        with django_assert_num_queries(0):
+            user, _ = JWTStatelessUserAuthentication().authenticate(request)
+            assert user.is_authenticated
+            assert (user.pk, user.username, user.is_staff) == (test_user.pk, 'testuser', False)
+        # Los atributos que no están en el token se cargan de la base de datos
+        assert user.date_joined == test_user.date_joined
+
+        # Usuario borrado después de emitir el token: 401, no un 500
+        test_user.delete()
+        with pytest.raises(AuthenticationFailed):
+            JWTStatelessUserAuthentication().authenticate(request)[0].email
+
+    def test_openapi_schema(self, api_client, settings, tmp_path):
+        settings.BOOKS_OPENAPI_DIR = str(tmp_path)
+        call_command('generate_openapi', stdout=io.StringIO())
+        assert len(list(tmp_path.glob('openapi-*.json'))) == 1
+
+        response = api_client.get('/openapi.json')
+        assert response.status_code == status.HTTP_302_FOUND
+        location = response['Location']
+        response = api_client.get(location)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'immutable' in response['Cache-Control']
+        assert '/api/books/' in json.loads(response.content)['paths']
+
+        response = api_client.get(location, HTTP_IF_NONE_MATCH=response['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
 
     def test_unauthorized_access(self, api_client, sample_book):
         response = api_client.post('/api/books/', sample_book, format='json')
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from rest_framework.authtoken import views as token_views
 from . import views
@@ -5,18 +6,63 @@ from .views import UserProfileView, LogoutView
 
 app_name = "books"
 
+if settings.BOOKS_ASYNC_VIEWS:
+    from . import async_views
+
+    book_list_create_view = async_views.AsyncBookListCreateView
+    book_detail_view = async_views.AsyncBookDetailView
+    book_year_stats_view = async_views.AsyncBookYearStatsView
+else:
+    book_list_create_view = views.BookListCreateView
+    book_detail_view = views.BookDetailView
+    book_year_stats_view = views.BookYearStatsView
+
 urlpatterns = [
     # Authentication endpoints
     path("token/", token_views.obtain_auth_token, name="token_obtain"),
     path("register/", views.UserRegistrationView.as_view(), name="register"),
     # Books endpoints
-    path("books/", views.BookListCreateView.as_view(), name="book-list-create"),
-    path("books/<str:pk>/", views.BookDetailView.as_view(), name="book-detail"),
+    path("books/", book_list_create_view.as_view(), name="book-list-create"),
+    path("books/bulk/", views.BookBulkView.as_view(), name="book-bulk"),
+    path("books/export/", views.BookExportView.as_view(), name="book-export"),
+    path("books/batch/", views.BookBatchView.as_view(), name="book-batch"),
+    path("books/changes/", views.BookChangesView.as_view(), name="book-changes"),
+    path("books/<str:pk>/", book_detail_view.as_view(), name="book-detail"),
     path(
         "books/stats/year/<int:year>/",
-        views.BookYearStatsView.as_view(),
+        book_year_stats_view.as_view(),
         name="book-year-stats",
     ),
+    path(
+        "books/stats/years/",
+        views.BookYearRangeStatsView.as_view(),
+        name="book-year-range-stats",
+    ),
+    path(
+        "books/stats/facets/",
+        views.BookFacetStatsView.as_view(),
+        name="book-facet-stats",
+    ),
+    path(
+        "books/stats/price-distribution/",
+        views.BookPriceDistributionView.as_view(),
+        name="book-price-distribution",
+    ),
     path('user/profile/', UserProfileView.as_view(), name='user-profile'),
     path('user/logout/', LogoutView.as_view(), name='logout'),
+    path(
+        "monitoring/mongo-pool/",
+        views.MongoPoolStatsView.as_view(),
+        name="mongo-pool-stats",
+    ),
+    path(
+        "monitoring/auth-cache/",
+        views.AuthCacheStatsView.as_view(),
+        name="auth-cache-stats",
+    ),
+    path(
+        "monitoring/book-cache/",
+        views.BookCacheStatsView.as_view(),
+        name="book-cache-stats",
+    ),
 ]
@@ -0,0 +1,188 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import connection
+
+from .shared_cache import shared_cache
+
+
+def _namespace():
+    # Una por base de datos: benchmark_api usa otra base con los mismos ids
+    return f"book_detail:{connection.settings_dict['NAME']}"
+
+
+def _generation_key():
+    return f'{_namespace()}:generation'
+
+
+def _version_key(pk):
+    return f'{_namespace()}:version:{pk}'
+
+
+def _entry_key(pk):
+    return f'{_namespace()}:{pk}'
+
+
+class BookDetailCache:
+    """
+    Caché de lectura de GET /api/books/{id}/: representación completa y updated_at de cada libro.
+
+    Un LRU acotado en memoria del proceso delante de una caché de CACHES. Cada
+    entrada guarda la versión del libro con la que se leyó: la generación
+    global más un contador por libro, ambos en la caché compartida. Una
+    escritura en cualquier worker incrementa el contador y las copias de los
+    demás dejan de coincidir sin tener que borrarlas.
+
+    Sin una caché compartida entre procesos (alias None, LocMemCache o
+    DummyCache) los contadores de un worker no verían las escrituras de los
+    demás, así que la caché queda desactivada.
+    """
+
+    def __init__(self, maxsize, ttl, alias):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.shared = shared_cache(alias)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _get_local(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, version, payload = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return version, payload
+
+    def _set_local(self, key, version, payload):
+        self._entries[key] = (time.monotonic() + self.ttl, version, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _versions(self, pk, keys=()):
+        """Lee la generación, el contador del libro y `keys` en un solo viaje a la caché compartida."""
+        counters = (_generation_key(), _version_key(pk))
+        values = self.shared.get_many([*counters, *keys])
+        for key in counters:
+            if key not in values:
+                # Contador nuevo o desalojado: empieza en un valor que no repite versiones anteriores
+                self.shared.add(key, time.time_ns(), timeout=None)
+                values[key] = self.shared.get(key)
+        version = tuple(values[key] for key in counters)
+        # Contador desalojado justo después de crearlo: sin versión fiable no se cachea
+        return (None if None in version else version), values
+
+    @property
+    def enabled(self):
+        return self.shared is not None
+
+    def get(self, pk):
+        """
+        Devuelve (versión, payload). payload es None si no está en caché o es de
+        otra versión; la versión se pasa a `set` tras leer el libro de MongoDB.
+        """
+        if not self.enabled:
+            return None, None
+        key = _entry_key(pk)
+        with self._lock:
+            local = self._get_local(key)
+        version, values = self._versions(pk, () if local is not None else (key,))
+        if version is None:
+            return None, None
+
+        if local is not None:
+            if local[0] == version:
+                with self._lock:
+                    self.local_hits += 1
+                return version, local[1]
+            values[key] = self.shared.get(key)
+
+        shared = values.get(key)
+        with self._lock:
+            if shared is not None and shared[0] == version:
+                self.shared_hits += 1
+                self._set_local(key, version, shared[1])
+                return version, shared[1]
+            self.misses += 1
+        return version, None
+
+    def set(self, pk, version, payload):
+        key = _entry_key(pk)
+        self.shared.set(key, (version, payload), timeout=self.ttl)
+        with self._lock:
+            self._set_local(key, version, payload)
+
+    def _increment(self, key):
+        try:
+            self.shared.incr(key)
+        except ValueError:
+            self.shared.add(key, time.time_ns(), timeout=None)
+
+    def invalidate(self, pk):
+        if not self.enabled:
+            return
+        self._increment(_version_key(pk))
+        with self._lock:
+            self._entries.pop(_entry_key(pk), None)
+            self.invalidations += 1
+
+    def invalidate_all(self):
+        """Para escrituras que no pasan por el modelo (importaciones, borrados masivos)."""
+        if not self.enabled:
+            return
+        self._increment(_generation_key())
+        with self._lock:
+            self._entries.clear()
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            hits = self.local_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_ratio': round(hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+_book_cache = None
+_book_cache_lock = threading.Lock()
+
+
+def get_book_cache():
+    global _book_cache
+    if _book_cache is None:
+        with _book_cache_lock:
+            if _book_cache is None:
+                _book_cache = BookDetailCache(
+                    settings.BOOKS_DETAIL_CACHE_SIZE,
+                    settings.BOOKS_DETAIL_CACHE_TTL,
+                    settings.BOOKS_DETAIL_CACHE_ALIAS,
+                )
+    return _book_cache
+
+
+def reset_book_cache():
+    """La siguiente llamada a get_book_cache vuelve a leer la configuración."""
+    global _book_cache
+    with _book_cache_lock:
+        _book_cache = None
@@ -0,0 +1,165 @@
+from django.utils import timezone
+from pymongo import DeleteOne, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from rest_framework import serializers
+
+from ..models import Book
+from ..serializers.book_serializer import BookSerializer, book_validated_data_to_document
+from .book_cache import get_book_cache
+from .changes import record_tombstones
+from .conditional import bump_collection_version
+from .mongo_connection import MongoDBConnection
+from .stats import apply_year_stats_changes
+
+BULK_OPERATIONS = ('create', 'update', 'delete')
+
+
+def _books_collection():
+    return MongoDBConnection.get_instance().get_collection(Book._meta.db_table)
+
+
+def reserve_book_ids(count):
+    """Reserva `count` ids consecutivos en el contador que djongo usa para el AutoField."""
+    auto = MongoDBConnection.get_instance().get_collection('__schema__').find_one_and_update(
+        {'name': Book._meta.db_table},
+        {'$inc': {'auto.seq': count}, '$setOnInsert': {'auto.field_names': ['id']}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    last_id = auto['auto']['seq']
+    return list(range(last_id - count + 1, last_id + 1))
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _prepare(operations):
+    """Valida las operaciones y resuelve el estado actual de los libros afectados."""
+    serializer = BookSerializer(many=True)
+    results, prepared = [], []
+
+    ids = [
+        _parse_id(operation.get('id'))
+        for operation in operations
+        if isinstance(operation, dict) and operation.get('op') in ('update', 'delete')
+    ]
+    # Año y precio actuales de cada libro, para validar ids y mantener book_year_stats
+    current = {
+        document['id']: (document['published_date'].year, document['price'])
+        for document in _books_collection().find(
+            {'id': {'$in': [pk for pk in ids if pk is not None]}},
+            {'id': 1, 'published_date': 1, 'price': 1},
+        )
+    }
+
+    for index, operation in enumerate(operations):
+        op = operation.get('op') if isinstance(operation, dict) else None
+        result = {'index': index, 'op': op}
+        results.append(result)
+
+        if op not in BULK_OPERATIONS:
+            result.update(status='invalid', errors={
+                'op': [f'Must be one of: {", ".join(BULK_OPERATIONS)}']
+            })
+            continue
+
+        pk = None
+        if op != 'create':
+            pk = _parse_id(operation.get('id'))
+            result['id'] = pk
+            if pk is None:
+                result.update(status='invalid', errors={'id': ['A valid integer id is required']})
+                continue
+            if pk not in current:
+                result['status'] = 'not_found'
+                continue
+
+        document = None
+        if op != 'delete':
+            try:
+                document = book_validated_data_to_document(
+                    serializer.child.run_validation(operation.get('data'))
+                )
+            except serializers.ValidationError as error:
+                result.update(status='invalid', errors=error.detail)
+                continue
+
+        previous = current.get(pk)
+        if op == 'delete':
+            del current[pk]
+        elif op == 'update':
+            current[pk] = (document['published_date'].year, document['price'])
+        prepared.append((result, document, previous))
+
+    return results, prepared
+
+
+def execute_bulk_operations(operations, ordered=True):
+    """
+    Ejecuta altas, modificaciones y bajas de libros en un único bulk_write.
+
+    Con ordered=True no se escribe nada si alguna operación es inválida y Mongo se
+    detiene en el primer error de escritura; con ordered=False se aplican las válidas.
+    """
+    results, prepared = _prepare(operations)
+    if ordered and len(prepared) != len(results):
+        for result in results:
+            result.setdefault('status', 'skipped')
+        return results
+
+    now = timezone.now()
+    creates = [item for item in prepared if item[0]['op'] == 'create']
+    new_ids = iter(reserve_book_ids(len(creates)) if creates else [])
+
+    requests = []
+    for result, document, previous in prepared:
+        if result['op'] == 'create':
+            result['id'] = next(new_ids)
+            requests.append(InsertOne({
+                **document, 'id': result['id'], 'created_at': now, 'updated_at': now,
+            }))
+        elif result['op'] == 'update':
+            requests.append(UpdateOne(
+                {'id': result['id']}, {'$set': {**document, 'updated_at': now}}
+            ))
+        else:
+            requests.append(DeleteOne({'id': result['id']}))
+
+    failed = {}
+    if requests:
+        try:
+            _books_collection().bulk_write(requests, ordered=ordered)
+        except BulkWriteError as error:
+            failed = {
+                write_error['index']: write_error['errmsg']
+                for write_error in error.details['writeErrors']
+            }
+
+    first_failure = min(failed) if failed else len(prepared)
+    added, removed = [], []
+    for position, (result, document, previous) in enumerate(prepared):
+        if position in failed:
+            result.update(status='error', errors={'non_field_errors': [failed[position]]})
+            continue
+        if ordered and position > first_failure:
+            result['status'] = 'skipped'
+            continue
+        result['status'] = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}[result['op']]
+        if previous is not None:
+            removed.append(previous)
+        if document is not None:
+            added.append((document['published_date'].year, document['price']))
+
+    apply_year_stats_changes(added=added, removed=removed)
+    record_tombstones([result['id'] for result in results if result.get('status') == 'deleted'])
+    book_cache = get_book_cache()
+    for result in results:
+        if result.get('status') in ('updated', 'deleted'):
+            book_cache.invalidate(result['id'])
+    if added or removed:
+        bump_collection_version()
+    return results
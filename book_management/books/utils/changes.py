@@ -0,0 +1,160 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from pymongo import ASCENDING, IndexModel
+
+from ..models import Book
+from ..repository import BookRepository
+from .conditional import VERSIONS_COLLECTION, truncate_to_milliseconds
+from .mongo_connection import MongoDBConnection
+
+TOMBSTONES_COLLECTION = 'book_tombstones'
+
+# Las escrituras se sellan con updated_at antes de llegar a MongoDB: lo más
+# reciente que esto se entrega en la siguiente sincronización para no perderlo
+SETTLE_TIME = timedelta(seconds=2)
+
+# En un mismo instante, las altas y modificaciones van antes que las bajas
+UPDATED, DELETED = 0, 1
+
+
+class InvalidSyncToken(Exception):
+    pass
+
+
+class SyncTokenExpired(Exception):
+    """Pueden faltar bajas: los tombstones expiraron o hubo un borrado masivo."""
+
+
+def _tombstones_collection():
+    return MongoDBConnection.get_instance().get_collection(TOMBSTONES_COLLECTION)
+
+
+def tombstone_indexes():
+    return [
+        IndexModel(
+            [('deleted_at', ASCENDING)],
+            name='book_tombstones_ttl_idx',
+            expireAfterSeconds=settings.BOOKS_TOMBSTONE_TTL_DAYS * 24 * 60 * 60,
+            background=True,
+        ),
+        IndexModel(
+            [('deleted_at', ASCENDING), ('id', ASCENDING)],
+            name='book_tombstones_deleted_at_id_idx',
+            background=True,
+        ),
+    ]
+
+
+def record_tombstones(ids):
+    """Registra la baja de los libros para que /api/books/changes/ la informe."""
+    deleted_at = timezone.now()
+    documents = [{'id': pk, 'deleted_at': deleted_at} for pk in ids if pk is not None]
+    if documents:
+        _tombstones_collection().insert_many(documents, ordered=False)
+
+
+def require_full_resync(model=Book):
+    """Invalida los tokens emitidos hasta ahora; para borrados masivos que no dejan tombstones."""
+    now = timezone.now()
+    MongoDBConnection.get_instance().get_collection(VERSIONS_COLLECTION).update_one(
+        {'_id': model._meta.db_table},
+        {'$set': {'resync_after': now}, '$setOnInsert': {'version': 0, 'updated_at': now}},
+        upsert=True,
+    )
+
+
+def _aware(value):
+    return timezone.make_aware(value, dt_timezone.utc) if timezone.is_naive(value) else value
+
+
+def encode_token(position, until=None):
+    moment, pk, kind = position
+    token = {'p': [moment.isoformat(), pk, kind]}
+    if until is not None:
+        token['u'] = until.isoformat()
+    return b64encode(json.dumps(token).encode('utf-8')).decode('ascii')
+
+
+def decode_token(encoded):
+    """Devuelve ((instante, id, tipo), until); until solo viaja entre páginas de una misma pasada."""
+    try:
+        token = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+        moment, pk, kind = token['p']
+        moment = parse_datetime(moment)
+        until = parse_datetime(token['u']) if 'u' in token else None
+    except (TypeError, ValueError, KeyError, UnicodeError):
+        raise InvalidSyncToken()
+    if moment is None or timezone.is_naive(moment) or kind not in (UPDATED, DELETED):
+        raise InvalidSyncToken()
+    if pk is not None and not isinstance(pk, int):
+        raise InvalidSyncToken()
+    return (moment, pk, kind), until
+
+
+def _check_not_expired(moment, now):
+    if moment < now - timedelta(days=settings.BOOKS_TOMBSTONE_TTL_DAYS):
+        raise SyncTokenExpired()
+    state = MongoDBConnection.get_instance().get_collection(VERSIONS_COLLECTION).find_one(
+        {'_id': Book._meta.db_table}, {'resync_after': 1}
+    )
+    if state and state.get('resync_after') and _aware(state['resync_after']) > moment:
+        raise SyncTokenExpired()
+
+
+def _deleted_after(position, until, limit):
+    query = {'deleted_at': {'$lte': until}}
+    if position is not None:
+        moment, pk, kind = position
+        keyset = {'deleted_at': {'$gt': moment}}
+        if pk is not None:
+            # Una baja va después de la modificación del mismo libro en el mismo instante
+            operator = '$gte' if kind == UPDATED else '$gt'
+            keyset = {'$or': [keyset, {'deleted_at': moment, 'id': {operator: pk}}]}
+        query = {'$and': [query, keyset]}
+    cursor = _tombstones_collection().find(query, {'_id': 0, 'id': 1, 'deleted_at': 1})
+    return [
+        {'id': document['id'], 'deleted_at': _aware(document['deleted_at'])}
+        for document in cursor.sort([('deleted_at', ASCENDING), ('id', ASCENDING)]).limit(limit)
+    ]
+
+
+def changes_since(token, limit):
+    """
+    Altas, modificaciones y bajas posteriores a `token`, como máximo `limit`.
+
+    Los cambios se recorren en orden (instante, id, tipo) hasta un límite
+    `until` fijado en la primera página, así que las páginas de una pasada no
+    se solapan ni dejan huecos. Sin token se recorre el catálogo completo.
+    """
+    now = timezone.now()
+    position, until = decode_token(token) if token else (None, None)
+    if position is not None:
+        _check_not_expired(position[0], now)
+    until = until or truncate_to_milliseconds(now - SETTLE_TIME)
+
+    books = BookRepository().changed(position and position[:2], until, limit + 1)
+    deleted = _deleted_after(position, until, limit + 1)
+    changes = sorted(
+        [((book['updated_at'], book['id'], UPDATED), 'updated', book) for book in books]
+        + [((tombstone['deleted_at'], tombstone['id'], DELETED), 'deleted', tombstone) for tombstone in deleted],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    if has_more:
+        token = encode_token(changes[-1][0], until)
+    else:
+        # Todo lo anterior o igual a until ya se entregó
+        token = encode_token((until, None, UPDATED))
+    return {
+        'updated': [change for _, kind, change in changes if kind == 'updated'],
+        'deleted': [change for _, kind, change in changes if kind == 'deleted'],
+        'sync_token': token,
+        'has_more': has_more,
+    }
@@ -0,0 +1,98 @@
+import hashlib
+from datetime import timezone as dt_timezone
+
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from pymongo import ReturnDocument
+
+from ..models import Book
+from .mongo_connection import AsyncMongoDBConnection, MongoDBConnection
+
+VERSIONS_COLLECTION = 'collection_versions'
+
+
+def _versions_collection():
+    return MongoDBConnection.get_instance().get_collection(VERSIONS_COLLECTION)
+
+
+def truncate_to_milliseconds(value):
+    # MongoDB guarda las fechas con precisión de milisegundos
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
+def bump_collection_version(model=Book):
+    """Incrementa la versión de la colección; se llama en cada escritura de libros."""
+    return _versions_collection().find_one_and_update(
+        {'_id': model._meta.db_table},
+        {'$inc': {'version': 1}, '$set': {'updated_at': timezone.now()}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _version_from_document(document):
+    if document is None:
+        return 0, None
+    updated_at = document['updated_at']
+    if timezone.is_naive(updated_at):
+        updated_at = timezone.make_aware(updated_at, dt_timezone.utc)
+    return document['version'], updated_at
+
+
+def collection_version(model=Book):
+    return _version_from_document(_versions_collection().find_one({'_id': model._meta.db_table}))
+
+
+async def async_collection_version(model=Book):
+    collection = AsyncMongoDBConnection.get_instance().get_collection(VERSIONS_COLLECTION)
+    return _version_from_document(await collection.find_one({'_id': model._meta.db_table}))
+
+
+def _etag(request, *parts):
+    renderer = getattr(request, 'accepted_renderer', None)
+    key = '|'.join(str(part) for part in (*parts, getattr(renderer, 'format', '')))
+    return quote_etag(hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def book_validators(request, pk, updated_at, fields=None):
+    """ETag y Last-Modified de un libro, derivados de su updated_at y de los campos pedidos."""
+    # Cada selección de campos es una representación distinta con su propio ETag
+    selection = ','.join(fields) if fields else ''
+    if updated_at is None:
+        return _etag(request, 'book', pk, selection), None
+    updated_at = truncate_to_milliseconds(updated_at)
+    return _etag(request, 'book', pk, updated_at.isoformat(), selection), updated_at
+
+
+def _collection_validators(request, model, version, updated_at):
+    return _etag(request, model._meta.db_table, version, request.get_full_path()), updated_at
+
+
+def collection_validators(request, model=Book):
+    """ETag y Last-Modified de un listado: versión de la colección más la URL pedida."""
+    return _collection_validators(request, model, *collection_version(model))
+
+
+async def async_collection_validators(request, model=Book):
+    return _collection_validators(request, model, *await async_collection_version(model))
+
+
+def evaluate_preconditions(request, etag, last_modified):
+    """Devuelve un 304/412 si las cabeceras condicionales lo permiten, o None para continuar."""
+    response = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=int(last_modified.timestamp()) if last_modified else None,
+    )
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+def set_validators(response, etag, last_modified):
+    if etag:
+        response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,59 @@
+import csv
+
+import orjson
+from django.conf import settings
+
+from ..models import Book
+from ..serializers.book_serializer import BookReadSerializer
+from .mongo_connection import MongoDBConnection
+
+EXPORT_FIELDS = BookReadSerializer.fields
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS}
+
+
+class _Echo:
+    # csv.writer necesita un archivo; devolvemos la línea en vez de guardarla
+    def write(self, value):
+        return value
+
+
+def find_books_for_export(query=None, batch_size=None, fields=None):
+    collection = MongoDBConnection.get_instance().get_collection(Book._meta.db_table)
+    projection = {field: 1 for field in fields} if fields else EXPORT_PROJECTION
+    return collection.find(
+        query or {},
+        projection,
+        batch_size=batch_size or settings.BOOKS_EXPORT_BATCH_SIZE,
+    ).sort('_id', 1)
+
+
+def _representation_batches(cursor, batch_size, fields):
+    try:
+        to_representation = BookReadSerializer(fields=fields).to_representation
+        batch = []
+        for document in cursor:
+            batch.append(to_representation(document))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    finally:
+        cursor.close()
+
+
+def stream_ndjson(cursor, batch_size=None, fields=None):
+    batch_size = batch_size or settings.BOOKS_EXPORT_BATCH_SIZE
+    for batch in _representation_batches(cursor, batch_size, fields):
+        yield b''.join(orjson.dumps(row) + b'\n' for row in batch)
+
+
+def stream_csv(cursor, batch_size=None, fields=None):
+    batch_size = batch_size or settings.BOOKS_EXPORT_BATCH_SIZE
+    fields = fields or EXPORT_FIELDS
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for batch in _representation_batches(cursor, batch_size, fields):
+        yield ''.join(
+            writer.writerow([row[field] for field in fields]) for row in batch
+        )
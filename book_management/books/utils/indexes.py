@@ -0,0 +1,34 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+from ..models import Book
+from .changes import TOMBSTONES_COLLECTION, tombstone_indexes
+
+
+def _model_indexes(model):
+    for index in model._meta.indexes:
+        keys = [
+            (
+                model._meta.get_field(field_name.lstrip('-')).column,
+                DESCENDING if field_name.startswith('-') else ASCENDING,
+            )
+            for field_name in index.fields
+        ]
+        yield IndexModel(keys, name=index.name, background=True)
+
+
+def declared_indexes():
+    """Índices que deben existir en MongoDB, agrupados por colección."""
+    return {
+        Book._meta.db_table: [
+            # djongo no garantiza el índice de la clave primaria si la colección no se migró
+            IndexModel(
+                [('id', ASCENDING)],
+                name='books_pk_idx',
+                unique=True,
+                partialFilterExpression={'id': {'$exists': True}},
+                background=True,
+            ),
+            *_model_indexes(Book),
+        ],
+        TOMBSTONES_COLLECTION: tombstone_indexes(),
+    }
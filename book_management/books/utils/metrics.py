@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Contadores de la petición en curso; None fuera de una petición (comandos, shell)
+current_request_stats = ContextVar('books_request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('db_queries', 'db_time', 'mongo_commands', 'mongo_time')
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.mongo_commands = 0
+        self.mongo_time = 0.0
+
+
+def record_db_query(execute, sql, params, many, context):
+    """execute_wrapper de Django: cuenta y mide las consultas del ORM (incluye la traducción de djongo)."""
+    stats = current_request_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_time += time.perf_counter() - started
+
+
+class MongoCommandMetricsListener(monitoring.CommandListener):
+    """Suma los comandos enviados a MongoDB por djongo y por el acceso directo."""
+
+    def started(self, event):
+        pass
+
+    def _record(self, event):
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.mongo_commands += 1
+            stats.mongo_time += event.duration_micros / 1e6
+
+    succeeded = _record
+    failed = _record
+
+
+# Totales de _ViewMetrics además del histograma, en el orden en que se guardan en los archivos
+_TOTALS = ('count', 'duration', 'response_bytes', 'db_queries', 'db_time', 'mongo_commands', 'mongo_time')
+
+
+class _ViewMetrics:
+    __slots__ = ('buckets', *_TOTALS)
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.duration = 0.0
+        self.response_bytes = 0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.mongo_commands = 0
+        self.mongo_time = 0.0
+
+
+def _labels(**labels):
+    return ','.join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in labels.items()
+    )
+
+
+def _merge(snapshots):
+    views, statuses = defaultdict(_ViewMetrics), defaultdict(int)
+    for snapshot in snapshots:
+        for view, method, buckets, *totals in snapshot['views']:
+            metrics = views[view, method]
+            metrics.buckets = [total + count for total, count in zip(metrics.buckets, buckets)]
+            for attribute, value in zip(_TOTALS, totals):
+                setattr(metrics, attribute, getattr(metrics, attribute) + value)
+        for view, method, status, count in snapshot['statuses']:
+            statuses[view, method, status] += count
+    return sorted(views.items()), sorted(statuses.items())
+
+
+class MetricsRegistry:
+    """
+    Métricas por vista (nombre de URL) y método.
+
+    Cada proceso las acumula en memoria. Con BOOKS_METRICS_DIR además las vuelca
+    a un archivo propio como mucho cada BOOKS_METRICS_FLUSH_INTERVAL segundos, y
+    `render` suma los archivos de todos los workers: el que atienda el scrape
+    devuelve los totales del servicio. Los archivos de workers que ya
+    terminaron se siguen sumando, así que los contadores no retroceden.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = defaultdict(_ViewMetrics)
+        self._statuses = defaultdict(int)
+        self._pid = None
+        self._path = None
+        self._flushed_at = 0.0
+
+    def _check_fork(self):
+        # Un worker recién creado no hereda los contadores ni el archivo de su padre
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._path = None
+            self._views.clear()
+            self._statuses.clear()
+
+    def observe(self, view, method, status, duration, response_bytes, stats):
+        with self._lock:
+            self._check_fork()
+            metrics = self._views[view, method]
+            metrics.buckets[bisect_left(LATENCY_BUCKETS, duration)] += 1
+            metrics.count += 1
+            metrics.duration += duration
+            metrics.response_bytes += response_bytes
+            metrics.db_queries += stats.db_queries
+            metrics.db_time += stats.db_time
+            metrics.mongo_commands += stats.mongo_commands
+            metrics.mongo_time += stats.mongo_time
+            self._statuses[view, method, status] += 1
+        if settings.BOOKS_METRICS_DIR and time.monotonic() - self._flushed_at >= settings.BOOKS_METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def _snapshot(self):
+        return {
+            'views': [
+                [view, method, metrics.buckets, *(getattr(metrics, attribute) for attribute in _TOTALS)]
+                for (view, method), metrics in self._views.items()
+            ],
+            'statuses': [[*key, count] for key, count in self._statuses.items()],
+        }
+
+    def flush(self):
+        """Escribe los contadores del proceso en su archivo de BOOKS_METRICS_DIR."""
+        directory = Path(settings.BOOKS_METRICS_DIR)
+        with self._lock:
+            self._check_fork()
+            if self._path is None:
+                # pid más un sufijo aleatorio: un worker nuevo con un pid reutilizado no pisa el archivo anterior
+                self._path = directory / f'{self._pid}-{uuid.uuid4().hex[:8]}.json'
+            path = self._path
+            content = json.dumps(self._snapshot())
+            self._flushed_at = time.monotonic()
+        directory.mkdir(parents=True, exist_ok=True)
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(content)
+        # Reemplazo atómico: un scrape nunca lee un archivo a medio escribir
+        os.replace(temporary, path)
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+            self._statuses.clear()
+            path, self._path = self._path, None
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def _collect(self):
+        if not settings.BOOKS_METRICS_DIR:
+            with self._lock:
+                return _merge([self._snapshot()])
+        self.flush()
+        snapshots = []
+        for path in Path(settings.BOOKS_METRICS_DIR).glob('*.json'):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                # Borrado entre el glob y la lectura
+                continue
+        return _merge(snapshots)
+
+    def render(self):
+        """Formato de texto de Prometheus (versión 0.0.4)."""
+        views, statuses = self._collect()
+
+        lines = [
+            '# HELP books_http_requests_total Peticiones HTTP atendidas.',
+            '# TYPE books_http_requests_total counter',
+        ]
+        for (view, method, status), count in statuses:
+            lines.append(f'books_http_requests_total{{{_labels(view=view, method=method, status=status)}}} {count}')
+
+        lines += [
+            '# HELP books_http_request_duration_seconds Latencia de las peticiones HTTP.',
+            '# TYPE books_http_request_duration_seconds histogram',
+        ]
+        for (view, method), metrics in views:
+            labels = _labels(view=view, method=method)
+            cumulative = 0
+            for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), metrics.buckets):
+                cumulative += count
+                lines.append(
+                    f'books_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'books_http_request_duration_seconds_sum{{{labels}}} {metrics.duration:.6f}')
+            lines.append(f'books_http_request_duration_seconds_count{{{labels}}} {metrics.count}')
+
+        counters = (
+            ('books_http_response_bytes_total', 'Bytes enviados en el cuerpo de las respuestas.', 'response_bytes'),
+            ('books_db_queries_total', 'Consultas del ORM (djongo).', 'db_queries'),
+            ('books_db_query_duration_seconds_total', 'Tiempo en consultas del ORM, traducción incluida.', 'db_time'),
+            ('books_mongo_commands_total', 'Comandos enviados a MongoDB.', 'mongo_commands'),
+            ('books_mongo_command_duration_seconds_total', 'Tiempo de los comandos de MongoDB.', 'mongo_time'),
+        )
+        for name, help_text, attribute in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for (view, method), metrics in views:
+                value = getattr(metrics, attribute)
+                value = f'{value:.6f}' if isinstance(value, float) else value
+                lines.append(f'{name}{{{_labels(view=view, method=method)}}} {value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
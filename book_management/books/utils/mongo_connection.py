@@ -1,33 +1,185 @@
-from pymongo import MongoClient
+import asyncio
+import os
+import threading
+import time
+import weakref
+
 from django.conf import settings
+from pymongo import MongoClient, monitoring
+
+from .metrics import MongoCommandMetricsListener
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """Cuenta conexiones en uso, esperas y tiempo de espera del pool de pymongo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._check_out_started = threading.local()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _waited(self):
+        started = getattr(self._check_out_started, 'value', None)
+        self._check_out_started.value = None
+        return time.monotonic() - started if started is not None else 0.0
+
+    def connection_check_out_started(self, event):
+        self._check_out_started.value = time.monotonic()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait_time = max(self.max_wait_time, waited)
+
+    def connection_check_out_failed(self, event):
+        self._waited()
+        with self._lock:
+            self.waiting -= 1
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'open_connections': self.open_connections,
+                'checked_out': self.checked_out,
+                'waiting': self.waiting,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'wait_time_seconds': round(self.wait_time, 6),
+                'max_wait_time_seconds': round(self.max_wait_time, 6),
+            }
+
 
 class MongoDBConnection:
+    """
+    Un único MongoClient (y su pool) por proceso, compartido por djongo y el acceso directo.
+
+    Si el proceso hace fork (workers de gunicorn) el cliente heredado se descarta
+    y el hijo crea el suyo; ver `reset` y gunicorn.conf.py.
+    """
     _instance = None
-    _client = None
+    _lock = threading.Lock()
 
     @classmethod
     def get_instance(cls):
-        if cls._instance is None:
-            cls._instance = cls()
-        return cls._instance
+        instance = cls._instance
+        if instance is None or instance._pid != os.getpid():
+            with cls._lock:
+                if cls._instance is None or cls._instance._pid != os.getpid():
+                    cls._instance = cls()
+                instance = cls._instance
+        return instance
+
+    @classmethod
+    def reset(cls):
+        # No se cierra el cliente heredado: sus sockets pertenecen al proceso padre
+        cls._lock = threading.Lock()
+        cls._instance = None
+
+    def __init__(self):
+        self._pid = os.getpid()
+        self.pool_stats = PoolStatsListener()
+        self._client = MongoClient(
+            settings.MONGODB_URI,
+            connect=False,
+            event_listeners=[self.pool_stats, MongoCommandMetricsListener()],
+            **settings.MONGODB_CLIENT_OPTIONS
+        )
+        self._db = None
+
+    def get_client(self):
+        return self._client
+
+    def get_database(self, name=None):
+        # El nombre se lee cada vez porque el runner de tests lo cambia por test_<nombre>
+        name = name or settings.DATABASES['default']['NAME']
+        if self._db is None or self._db.name != name:
+            self._db = self._client[name]
+        return self._db
+
+    def get_collection(self, collection_name):
+        return self.get_database()[collection_name]
+
+    def get_pool_stats(self):
+        return {
+            'pid': self._pid,
+            'max_pool_size': self._client.max_pool_size,
+            **self.pool_stats.snapshot(),
+        }
+
+    def close(self):
+        self._client.close()
+
+
+class AsyncMongoDBConnection:
+    """
+    Cliente de motor para las vistas async.
+
+    Un cliente de motor queda ligado al event loop en que se usa, así que se crea
+    uno por loop: uno solo por worker con uvicorn, y uno por petición si las vistas
+    async se sirven por WSGI (runserver, tests).
+    """
+    _instances = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def get_instance(cls):
+        loop = asyncio.get_running_loop()
+        instance = cls._instances.get(loop)
+        if instance is None:
+            instance = cls._instances[loop] = cls()
+            weakref.finalize(loop, instance.close)
+        return instance
 
     def __init__(self):
-        if self._client is None:
-            self._client = MongoClient(
-                settings.MONGODB_URI,
-                tls=True,
-                tlsAllowInvalidCertificates=True,
-                retryWrites=True,
-                connectTimeoutMS=30000,
-                socketTimeoutMS=None,
-                connect=False,
-                maxPoolSize=1
-            )
-            self._db = self._client[settings.MONGODB_DB.name]
+        # motor solo es necesario con BOOKS_ASYNC_VIEWS
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        self._client = AsyncIOMotorClient(settings.MONGODB_URI, **settings.MONGODB_CLIENT_OPTIONS)
+
+    def get_client(self):
+        return self._client
+
+    def get_database(self, name=None):
+        return self._client[name or settings.DATABASES['default']['NAME']]
 
     def get_collection(self, collection_name):
-        return self._db[collection_name]
+        return self.get_database()[collection_name]
 
     def close(self):
-        if self._client:
-            self._client.close()
\ No newline at end of file
+        self._client.close()
@@ -0,0 +1,87 @@
+import hashlib
+import os
+import threading
+from importlib import import_module
+from pathlib import Path
+
+import drf_yasg
+import rest_framework
+from django.apps import apps
+from django.conf import settings
+from drf_yasg.app_settings import swagger_settings
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+# Un año: el contenido de cada URL versionada no cambia
+MAX_AGE = 365 * 24 * 60 * 60
+
+_schemas = {}
+_lock = threading.Lock()
+_code_version = None
+
+
+def code_version():
+    """
+    Huella del código que define el esquema: fuentes del proyecto y versiones
+    de DRF y drf_yasg. Cambia solo cuando cambia alguna de ellas.
+    """
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256(f'{rest_framework.VERSION}:{drf_yasg.__version__}'.encode())
+        roots = [
+            Path(apps.get_app_config('books').path),
+            Path(import_module(settings.ROOT_URLCONF).__file__).parent,
+        ]
+        for root in roots:
+            for path in sorted(root.rglob('*.py')):
+                if 'tests' in path.relative_to(root).parts:
+                    continue
+                digest.update(path.relative_to(root.parent).as_posix().encode())
+                digest.update(path.read_bytes())
+        _code_version = digest.hexdigest()[:16]
+    return _code_version
+
+
+def schema_path(version=None):
+    return Path(settings.BOOKS_OPENAPI_DIR) / f'openapi-{version or code_version()}.json'
+
+
+def generate_schema():
+    """Genera el esquema completo, igual que /swagger/?format=openapi pero sin depender de la petición."""
+    generator = OpenAPISchemaGenerator(swagger_settings.DEFAULT_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return OpenAPICodecJson(validators=[], pretty=False).encode(schema)
+
+
+def write_schema(content, path):
+    # Escritura atómica: otro worker puede estar leyendo el archivo
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temporary = path.with_name(f'.{path.name}.{os.getpid()}')
+    temporary.write_bytes(content)
+    os.replace(temporary, path)
+
+
+def get_schema():
+    """
+    Devuelve (contenido, etag) del esquema de la versión actual del código.
+
+    Se lee del archivo generado en el build (`manage.py generate_openapi`); si
+    no existe se genera una sola vez por proceso y se guarda para los demás.
+    """
+    version = code_version()
+    cached = _schemas.get(version)
+    if cached is not None:
+        return cached
+    with _lock:
+        if version not in _schemas:
+            path = schema_path(version)
+            try:
+                content = path.read_bytes()
+            except FileNotFoundError:
+                content = generate_schema()
+                try:
+                    write_schema(content, path)
+                except OSError:
+                    pass
+            _schemas[version] = (content, f'"{hashlib.sha256(content).hexdigest()[:32]}"')
+        return _schemas[version]
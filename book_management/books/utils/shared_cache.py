@@ -0,0 +1,14 @@
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+# Cada proceso tiene la suya (o ninguna): lo que se guarda o invalida en un worker no llega a los demás
+UNSHARED_BACKENDS = (LocMemCache, DummyCache)
+
+
+def shared_cache(alias):
+    """La caché `alias` de CACHES si la comparten todos los workers; None sin alias o si es por proceso."""
+    if not alias:
+        return None
+    cache = caches[alias]
+    return None if isinstance(cache, UNSHARED_BACKENDS) else cache
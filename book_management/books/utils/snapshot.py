@@ -0,0 +1,258 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from ..models import Book
+from .changes import SETTLE_TIME, UPDATED, SyncTokenExpired, changes_since, decode_token, encode_token
+from .conditional import truncate_to_milliseconds, set_validators
+from .mongo_connection import MongoDBConnection
+from .stats import format_stats, format_price_distribution
+
+try:
+    import numpy as np
+except ImportError:
+    # NumPy es opcional: sin él todas las estadísticas se calculan en MongoDB
+    np = None
+
+# id (int64), precio (float64), año (int16), género y autor (int32)
+BYTES_PER_BOOK = 8 + 8 + 2 + 4 + 4
+
+REFRESH_BATCH_SIZE = 1000
+
+# Tras una escritura, las peticiones de los próximos SETTLE_TIME no pueden
+# verla en la instantánea: como mucho un refresco cada medio segundo mientras tanto
+MIN_REFRESH_INTERVAL = 0.5
+
+# Segundos antes de volver a intentarlo cuando el catálogo no cabe en memoria
+TOO_LARGE_RETRY_INTERVAL = 60
+
+Columns = namedtuple('Columns', 'ids prices years genres authors')
+
+
+class SnapshotTooLarge(Exception):
+    pass
+
+
+class _Dictionary:
+    """Codificación por diccionario de una columna de texto: cada valor distinto recibe un código entero."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value):
+        # -1 no coincide con ningún libro
+        return self.codes.get(value, -1)
+
+
+def _max_bytes():
+    return settings.BOOKS_SNAPSHOT_MAX_MEMORY_MB * 1024 * 1024
+
+
+class CatalogueSnapshot:
+    """
+    Precio, año de publicación, género y autor de todos los libros en arrays de
+    NumPy, para responder percentiles, histogramas y estadísticas por año con
+    operaciones vectorizadas.
+
+    Se pone al día con /api/books/changes/ (changes_since): `until` es el
+    instante hasta el que están incluidas todas las escrituras. Las columnas se
+    sustituyen de una vez en cada refresco, así que se pueden leer sin bloqueo.
+    """
+
+    def __init__(self):
+        self.columns = Columns(
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=np.float64),
+            np.empty(0, dtype=np.int16),
+            np.empty(0, dtype=np.int32),
+            np.empty(0, dtype=np.int32),
+        )
+        self.genres = _Dictionary()
+        self.authors = _Dictionary()
+        self.sync_token = None
+        self.until = None
+        self.refreshed_at = None
+
+    @classmethod
+    def build(cls):
+        collection = MongoDBConnection.get_instance().get_collection(Book._meta.db_table)
+        if collection.estimated_document_count() * BYTES_PER_BOOK > _max_bytes():
+            raise SnapshotTooLarge()
+
+        snapshot = cls()
+        until = truncate_to_milliseconds(timezone.now() - SETTLE_TIME)
+        # Los libros sin id numérico (insertados fuera de djongo) no tienen tombstones y se omiten
+        cursor = collection.find(
+            {'id': {'$type': 'number'}},
+            {'_id': 0, 'id': 1, 'price': 1, 'published_date': 1, 'genre': 1, 'author': 1},
+        )
+        batch_size = settings.BOOKS_EXPORT_BATCH_SIZE
+        chunks, batch = [], []
+        for document in cursor:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                chunks.append(snapshot._encode(batch))
+                batch = []
+        chunks.append(snapshot._encode(batch))
+        snapshot._replace(Columns(*(np.concatenate(column) for column in zip(*chunks))))
+        # Lo escrito durante la lectura vuelve a llegar en el primer refresco; aplicarlo otra vez no cambia nada
+        snapshot.sync_token = encode_token((until, None, UPDATED))
+        snapshot.until = until
+        snapshot.refreshed_at = time.monotonic()
+        return snapshot
+
+    def refresh(self):
+        """Aplica las altas, modificaciones y bajas desde el último refresco; SyncTokenExpired si hay que reconstruirla."""
+        books, deleted = {}, set()
+        token = self.sync_token
+        while True:
+            changes = changes_since(token, REFRESH_BATCH_SIZE)
+            # Van en orden de updated_at: la última versión de cada libro queda encima
+            books.update((book['id'], book) for book in changes['updated'] if isinstance(book['id'], int))
+            deleted.update(tombstone['id'] for tombstone in changes['deleted'])
+            token = changes['sync_token']
+            if not changes['has_more']:
+                break
+
+        if books or deleted:
+            columns = self.columns
+            removed = deleted | books.keys()
+            keep = ~np.isin(columns.ids, np.fromiter(removed, dtype=np.int64, count=len(removed)))
+            # Los ids no se reutilizan: un libro dado de baja no vuelve
+            added = self._encode([book for pk, book in books.items() if pk not in deleted])
+            self._replace(Columns(*(
+                np.concatenate([column[keep], values]) for column, values in zip(columns, added)
+            )))
+        self.sync_token = token
+        (self.until, _, _), _ = decode_token(token)
+        self.refreshed_at = time.monotonic()
+
+    def _encode(self, books):
+        """Columnas de una lista de libros (documentos o dicts de BookRepository)."""
+        rows = [
+            (book['id'], book['price'], book['published_date'].year,
+             self.genres.encode(book.get('genre')), self.authors.encode(book.get('author')))
+            for book in books
+        ]
+        values = zip(*rows) if rows else [()] * len(Columns._fields)
+        return Columns(*(np.array(value, dtype=column.dtype) for value, column in zip(values, self.columns)))
+
+    def _replace(self, columns):
+        if sum(column.nbytes for column in columns) > _max_bytes():
+            raise SnapshotTooLarge()
+        self.columns = columns
+
+    def covers(self, as_of, tolerance=timedelta(0)):
+        """Si incluye todas las escrituras hasta `as_of` (la última escritura de la colección), con `tolerance` de margen."""
+        return as_of is None or self.until >= as_of - tolerance
+
+    def _mask(self, columns, year=None, genre=None, author=None):
+        mask = None
+        for column, value in (
+            (columns.years, year),
+            (columns.genres, None if genre is None else self.genres.code(genre)),
+            (columns.authors, None if author is None else self.authors.code(author)),
+        ):
+            if value is not None:
+                mask = column == value if mask is None else mask & (column == value)
+        return mask
+
+    def year_stats(self, year):
+        """Lo mismo que las estadísticas de un año de book_year_stats; None si no hay libros."""
+        columns = self.columns
+        prices = columns.prices[self._mask(columns, year=year)]
+        if not len(prices):
+            return None
+        return format_stats(year, {
+            'total_books': len(prices),
+            'total_price': float(prices.sum()),
+            'average_price': float(prices.mean()),
+            'minimum_price': float(prices.min()),
+            'maximum_price': float(prices.max()),
+            'price_stddev': float(prices.std()),
+        })
+
+    def price_distribution(self, year=None, genre=None, author=None, bins=10, percentiles=()):
+        columns = self.columns
+        mask = self._mask(columns, year=year, genre=genre, author=author)
+        prices = columns.prices if mask is None else columns.prices[mask]
+        if not len(prices):
+            return None
+        counts, edges = np.histogram(prices, bins=bins)
+        values = np.percentile(prices, percentiles) if percentiles else []
+        return format_price_distribution(
+            len(prices), float(prices.min()), float(prices.max()),
+            zip(percentiles, map(float, values)), edges.tolist(), counts.tolist(),
+        )
+
+
+_snapshot = None
+_too_large_at = None
+_lock = threading.Lock()
+
+
+def snapshot_enabled():
+    return settings.BOOKS_COLUMNAR_SNAPSHOT and np is not None
+
+
+def get_snapshot(as_of):
+    """
+    La instantánea del proceso, construida la primera vez y refrescada si no
+    incluye la escritura de `as_of`. None si está desactivada, si no cabe en
+    BOOKS_SNAPSHOT_MAX_MEMORY_MB o si va más de BOOKS_SNAPSHOT_MAX_STALENESS
+    segundos por detrás: entonces se consulta MongoDB.
+    """
+    global _snapshot, _too_large_at
+    if not snapshot_enabled():
+        return None
+    if _too_large_at is not None and time.monotonic() - _too_large_at < TOO_LARGE_RETRY_INTERVAL:
+        return None
+
+    snapshot = _snapshot
+    if snapshot is None or (
+        not snapshot.covers(as_of)
+        and time.monotonic() - snapshot.refreshed_at >= MIN_REFRESH_INTERVAL
+    ):
+        # Un solo hilo construye o refresca; los demás esperan y usan el resultado
+        with _lock:
+            try:
+                if _snapshot is None:
+                    _snapshot = CatalogueSnapshot.build()
+                elif not _snapshot.covers(as_of):
+                    try:
+                        _snapshot.refresh()
+                    except SyncTokenExpired:
+                        _snapshot = CatalogueSnapshot.build()
+            except SnapshotTooLarge:
+                _snapshot, _too_large_at = None, time.monotonic()
+            snapshot = _snapshot
+
+    tolerance = timedelta(seconds=settings.BOOKS_SNAPSHOT_MAX_STALENESS)
+    if snapshot is None or not snapshot.covers(as_of, tolerance):
+        return None
+    return snapshot
+
+
+def reset_snapshot():
+    global _snapshot, _too_large_at
+    with _lock:
+        _snapshot = _too_large_at = None
+
+
+def set_snapshot_validators(response, snapshot, etag, last_modified):
+    # Una instantánea que todavía no incluye la última escritura no puede llevar el ETag de la colección
+    if snapshot is not None and not snapshot.covers(last_modified):
+        return response
+    return set_validators(response, etag, last_modified)
@@ -0,0 +1,342 @@
+import math
+from collections import defaultdict
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from ..models import Book
+from .mongo_connection import MongoDBConnection
+
+YEAR_STATS_COLLECTION = 'book_year_stats'
+
+PRICE_STATS_GROUP = {
+    'total_books': {'$sum': 1},
+    'total_price': {'$sum': '$price'},
+    'average_price': {'$avg': '$price'},
+    'minimum_price': {'$min': '$price'},
+    'maximum_price': {'$max': '$price'},
+    'price_stddev': {'$stdDevPop': '$price'},
+}
+
+
+# Acumuladores que se pueden mantener de forma incremental en book_year_stats
+MATERIALIZED_STATS_GROUP = {
+    'total_books': {'$sum': 1},
+    'total_price': {'$sum': '$price'},
+    'sum_squares': {'$sum': {'$multiply': ['$price', '$price']}},
+    'minimum_price': {'$min': '$price'},
+    'maximum_price': {'$max': '$price'},
+}
+
+
+def _books_collection():
+    return MongoDBConnection.get_instance().get_collection(Book._meta.db_table)
+
+
+def _year_stats_collection():
+    return MongoDBConnection.get_instance().get_collection(YEAR_STATS_COLLECTION)
+
+
+def _published_between(start_year, end_year):
+    return {
+        'published_date': {
+            '$gte': datetime(start_year, 1, 1),
+            '$lt': datetime(end_year + 1, 1, 1),
+        }
+    }
+
+
+def format_stats(year, group):
+    return {'year': year, **_price_stats(group)}
+
+
+def _price_stats(group):
+    return {
+        'average_price': round(group['average_price'], 2),
+        'minimum_price': group['minimum_price'],
+        'maximum_price': group['maximum_price'],
+        'total_books': group['total_books'],
+        'total_price': round(group['total_price'], 2),
+        'price_stddev': round(group['price_stddev'], 2),
+    }
+
+
+def year_stats(year):
+    """Estadísticas de precio de un año en una sola agregación; None si no hay libros."""
+    pipeline = [
+        {'$match': _published_between(year, year)},
+        {'$group': {'_id': None, **PRICE_STATS_GROUP}},
+    ]
+    group = next(_books_collection().aggregate(pipeline), None)
+    if group is None or not group['total_books']:
+        return None
+    return format_stats(year, group)
+
+
+def year_range_stats(start_year, end_year):
+    """Estadísticas agrupadas por año de publicación, solo para los años con libros."""
+    pipeline = [
+        {'$match': _published_between(start_year, end_year)},
+        {'$group': {'_id': {'$year': '$published_date'}, **PRICE_STATS_GROUP}},
+        {'$sort': {'_id': 1}},
+    ]
+    return [
+        format_stats(group['_id'], group)
+        for group in _books_collection().aggregate(pipeline)
+    ]
+
+
+def _decade(field):
+    year = {'$year': field}
+    return {'$subtract': [year, {'$mod': [year, 10]}]}
+
+
+def facet_stats(query, limit):
+    """
+    Totales y estadísticas de precio por género, por autor (los `limit` con más
+    libros) y por década de publicación, en una sola agregación con $facet.
+    """
+    def top(field):
+        return [
+            {'$group': {'_id': f'${field}', **PRICE_STATS_GROUP}},
+            {'$sort': {'total_books': -1, '_id': 1}},
+            {'$limit': limit},
+        ]
+
+    pipeline = [
+        {'$match': query},
+        {'$facet': {
+            'total': [{'$group': {'_id': None, **PRICE_STATS_GROUP}}],
+            'genres': top('genre'),
+            'authors': top('author'),
+            'decades': [
+                {'$match': {'published_date': {'$type': 'date'}}},
+                {'$group': {'_id': _decade('$published_date'), **PRICE_STATS_GROUP}},
+                {'$sort': {'_id': 1}},
+            ],
+        }},
+    ]
+    facets = next(_books_collection().aggregate(pipeline))
+    return {
+        'total': _price_stats(facets['total'][0]) if facets['total'] else None,
+        'genres': [{'genre': group['_id'], **_price_stats(group)} for group in facets['genres']],
+        'authors': [{'author': group['_id'], **_price_stats(group)} for group in facets['authors']],
+        'decades': [{'decade': group['_id'], **_price_stats(group)} for group in facets['decades']],
+    }
+
+
+def format_price_distribution(total_books, minimum_price, maximum_price, percentiles, edges, counts):
+    return {
+        'total_books': total_books,
+        'minimum_price': minimum_price,
+        'maximum_price': maximum_price,
+        'percentiles': {f'p{percentile:g}': round(value, 2) for percentile, value in percentiles},
+        'histogram': [
+            {'from': round(edges[index], 2), 'to': round(edges[index + 1], 2), 'count': count}
+            for index, count in enumerate(counts)
+        ],
+    }
+
+
+def _histogram_edges(low, high, bins):
+    # Intervalos de igual anchura entre el mínimo y el máximo, como numpy.histogram
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    step = (high - low) / bins
+    return [low + index * step for index in range(bins)] + [high]
+
+
+def _price_at(collection, query, total_books, percentile):
+    """Percentil con interpolación lineal, como numpy.percentile, leyendo solo los dos precios vecinos."""
+    position = (total_books - 1) * percentile / 100
+    lower = math.floor(position)
+    # (price, id) es el orden del índice books_price_id_idx
+    cursor = collection.find(query, {'_id': 0, 'price': 1}).sort([('price', 1), ('id', 1)])
+    prices = [document['price'] for document in cursor.skip(lower).limit(2)]
+    upper = prices[1] if len(prices) > 1 else prices[0]
+    return prices[0] + (upper - prices[0]) * (position - lower)
+
+
+def price_distribution(year=None, genre=None, author=None, bins=10, percentiles=()):
+    """
+    Percentiles e histograma de precios calculados en MongoDB; None si no hay libros.
+
+    Ningún paso trae todos los precios al proceso: mínimo y máximo con $group,
+    el histograma con $bucket y cada percentil con un find ordenado de dos documentos.
+    """
+    query = _published_between(year, year) if year is not None else {}
+    for field, value in (('genre', genre), ('author', author)):
+        if value is not None:
+            query[field] = value
+    collection = _books_collection()
+
+    summary = next(collection.aggregate([
+        {'$match': query},
+        {'$group': {
+            '_id': None,
+            'total_books': {'$sum': 1},
+            'minimum_price': {'$min': '$price'},
+            'maximum_price': {'$max': '$price'},
+        }},
+    ]), None)
+    if summary is None:
+        return None
+    total_books = summary['total_books']
+
+    edges = _histogram_edges(summary['minimum_price'], summary['maximum_price'], bins)
+    # $bucket excluye el límite superior: el último intervalo se alarga para incluir el máximo, como en numpy.
+    # Los precios escritos entre las dos consultas que quedan fuera caen en `default` y se ignoran
+    boundaries = [*edges[:-1], edges[-1] + (edges[1] - edges[0])]
+    buckets = collection.aggregate([
+        {'$match': query},
+        {'$bucket': {
+            'groupBy': '$price',
+            'boundaries': boundaries,
+            'default': 'outside',
+            'output': {'count': {'$sum': 1}},
+        }},
+    ])
+    # Los intervalos vacíos no aparecen en el resultado
+    counts = {bucket['_id']: bucket['count'] for bucket in buckets}
+
+    return format_price_distribution(
+        total_books, summary['minimum_price'], summary['maximum_price'],
+        [(percentile, _price_at(collection, query, total_books, percentile)) for percentile in percentiles],
+        edges, [counts.get(edge, 0) for edge in edges[:-1]],
+    )
+
+
+def format_materialized_stats(document):
+    total_books = document['total_books']
+    average_price = document['total_price'] / total_books
+    variance = max(document['sum_squares'] / total_books - average_price ** 2, 0)
+    return format_stats(document['_id'], {
+        **document,
+        'average_price': average_price,
+        'price_stddev': math.sqrt(variance),
+    })
+
+
+def materialized_year_query(year):
+    return {'_id': year, 'total_books': {'$gt': 0}}
+
+
+def materialized_year_stats(year):
+    """Lee las estadísticas precalculadas de un año; None si no hay libros."""
+    document = _year_stats_collection().find_one(materialized_year_query(year))
+    if document is None:
+        return None
+    return format_materialized_stats(document)
+
+
+def materialized_year_range_stats(start_year, end_year):
+    documents = _year_stats_collection().find({
+        '_id': {'$gte': start_year, '$lte': end_year},
+        'total_books': {'$gt': 0},
+    }).sort('_id', 1)
+    return [format_materialized_stats(document) for document in documents]
+
+
+def apply_year_stats_changes(added=(), removed=()):
+    """Aplica altas y bajas de (año, precio) a book_year_stats en un solo bulk_write."""
+    deltas = defaultdict(lambda: {'total_books': 0, 'total_price': 0.0, 'sum_squares': 0.0})
+    bounds = {}
+    for year, price in added:
+        deltas[year]['total_books'] += 1
+        deltas[year]['total_price'] += price
+        deltas[year]['sum_squares'] += price * price
+        low, high = bounds.get(year, (price, price))
+        bounds[year] = (min(low, price), max(high, price))
+    for year, price in removed:
+        deltas[year]['total_books'] -= 1
+        deltas[year]['total_price'] -= price
+        deltas[year]['sum_squares'] -= price * price
+    if not deltas:
+        return
+
+    collection = _year_stats_collection()
+    requests = []
+    for year, delta in deltas.items():
+        update = {'$inc': delta}
+        if year in bounds:
+            update['$min'] = {'minimum_price': bounds[year][0]}
+            update['$max'] = {'maximum_price': bounds[year][1]}
+        requests.append(UpdateOne({'_id': year}, update, upsert=True))
+    collection.bulk_write(requests, ordered=False)
+
+    removed_prices = defaultdict(list)
+    for year, price in removed:
+        removed_prices[year].append(price)
+    if not removed_prices:
+        return
+
+    empty_years, stale_years = [], []
+    for document in collection.find({'_id': {'$in': list(removed_prices)}}):
+        year = document['_id']
+        if document['total_books'] <= 0:
+            empty_years.append(year)
+        elif any(
+            price <= document['minimum_price'] or price >= document['maximum_price']
+            for price in removed_prices[year]
+        ):
+            stale_years.append(year)
+
+    if empty_years:
+        collection.delete_many({'_id': {'$in': empty_years}, 'total_books': {'$lte': 0}})
+    if stale_years:
+        # min/max no se pueden decrementar: se recalculan solo para esos años
+        groups = _books_collection().aggregate([
+            {'$match': {'$or': [_published_between(year, year) for year in stale_years]}},
+            {'$group': {
+                '_id': {'$year': '$published_date'},
+                'minimum_price': MATERIALIZED_STATS_GROUP['minimum_price'],
+                'maximum_price': MATERIALIZED_STATS_GROUP['maximum_price'],
+            }},
+        ])
+        requests = [
+            UpdateOne({'_id': group['_id']}, {'$set': {
+                'minimum_price': group['minimum_price'],
+                'maximum_price': group['maximum_price'],
+            }})
+            for group in groups
+        ]
+        if requests:
+            collection.bulk_write(requests, ordered=False)
+
+
+def rebuild_year_stats():
+    """Recalcula book_year_stats desde cero; $out reemplaza la colección de forma atómica."""
+    _books_collection().aggregate([
+        {'$match': {'published_date': {'$type': 'date'}}},
+        {'$group': {'_id': {'$year': '$published_date'}, **MATERIALIZED_STATS_GROUP}},
+        {'$out': YEAR_STATS_COLLECTION},
+    ])
+
+
+def year_stats_is_empty():
+    return _year_stats_collection().estimated_document_count() == 0
+
+
+def year_stats_match(materialized, computed):
+    if materialized is None or computed is None:
+        return materialized is computed
+    return all(
+        math.isclose(materialized[key], computed[key], abs_tol=0.01)
+        for key in computed
+    )
+
+
+def inconsistent_years(start_year=1, end_year=9998):
+    """Años cuyas estadísticas materializadas no coinciden con las calculadas."""
+    materialized = {
+        stats['year']: stats
+        for stats in materialized_year_range_stats(start_year, end_year)
+    }
+    computed = {
+        stats['year']: stats
+        for stats in year_range_stats(start_year, end_year)
+    }
+    return sorted(
+        year for year in materialized.keys() | computed.keys()
+        if not year_stats_match(materialized.get(year), computed.get(year))
+    )
@@ -1,16 +1,52 @@
 from rest_framework import status, generics, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from django.contrib.auth.models import User
+from django.conf import settings
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
-from django.utils import timezone
-from datetime import datetime
+from django.http import HttpResponse, HttpResponseRedirect, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from collections import Counter
+from .filters import (
+    BookFacetStatsSerializer,
+    BookFieldsSerializer,
+    BookFilterSerializer,
+    PriceDistributionSerializer,
+    books_mongo_query,
+)
 from .models import Book
-from .serializers.book_serializer import BookSerializer, UserSerializer
+from .pagination import BookCursorPagination
+from .permissions import IsMetricsScraper
+from .renderers import CSVRenderer, NDJSONRenderer, PrometheusRenderer
+from .repository import BookRepository
+from .serializers.book_serializer import (
+    BookSerializer,
+    UserSerializer,
+    BookReadSerializer,
+)
 from rest_framework.authtoken.models import Token
-from rest_framework.authentication import TokenAuthentication
+from .authentication import CachedTokenAuthentication, MetricsTokenAuthentication, get_token_cache
+from .utils.book_cache import get_book_cache
+from .utils.bulk import execute_bulk_operations
+from .utils.conditional import (
+    book_validators,
+    collection_validators,
+    evaluate_preconditions,
+    set_validators,
+)
+from .utils import metrics, openapi
+from .utils.changes import InvalidSyncToken, SyncTokenExpired, changes_since
+from .utils.export import find_books_for_export, stream_csv, stream_ndjson
+from .utils.mongo_connection import MongoDBConnection
+from .utils.snapshot import get_snapshot, set_snapshot_validators
+from .utils.stats import year_stats_match
 
 # Registro de Usuarios
 class UserSerializer(serializers.ModelSerializer):
@@ -62,11 +98,31 @@ class UserRegistrationView(generics.CreateAPIView):
 # Vistas de Libros
 class BookListCreateView(APIView):
     permission_classes = [IsAuthenticated]
+    pagination_class = BookCursorPagination
 
     def get(self, request):
-        books = Book.objects.all()
-        serializer = BookSerializer(books, many=True)
-        return Response(serializer.data)
+        filters = BookFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, last_modified = collection_validators(request)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        paginator = self.pagination_class()
+        books = paginator.paginate_books(
+            BookRepository(),
+            filters.validated_data,
+            request,
+            view=self,
+            ordering=filters.validated_data['ordering'],
+            fields=filters.validated_data['fields']
+        )
+        response = paginator.get_paginated_response(
+            BookReadSerializer(books, many=True, fields=filters.validated_data['fields']).data
+        )
+        return set_validators(response, etag, last_modified)
 
     def post(self, request):
         serializer = BookSerializer(data=request.data)
@@ -75,6 +131,129 @@ class BookListCreateView(APIView):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class BookBulkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({
+                'operations': ['A non-empty list of operations is required']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > settings.BOOKS_BULK_MAX_OPERATIONS:
+            return Response({
+                'operations': [f'At most {settings.BOOKS_BULK_MAX_OPERATIONS} operations per request']
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        ordered = request.data.get('ordered', True)
+        if not isinstance(ordered, bool):
+            return Response({
+                'ordered': ['Must be a boolean']
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = execute_bulk_operations(operations, ordered=ordered)
+        summary = Counter(result['status'] for result in results)
+        rejected = ordered and (summary['invalid'] or summary['not_found'])
+        return Response({
+            'ordered': ordered,
+            'summary': dict(summary),
+            'results': results
+        }, status=status.HTTP_400_BAD_REQUEST if rejected else status.HTTP_200_OK)
+
+class BookBatchView(APIView):
+    """Varios libros por id con una sola consulta, en el orden pedido (?ids=1,2,3 o POST {"ids": [...]})."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        ids = request.query_params.get('ids', '')
+        return self.batch(request, [pk.strip() for pk in ids.split(',') if pk.strip()])
+
+    def post(self, request):
+        # POST para listas que no caben en la URL
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(pk, (str, int)) for pk in ids):
+            return Response({
+                'ids': ['A list of book ids is required']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return self.batch(request, [str(pk) for pk in ids])
+
+    def batch(self, request, ids):
+        # Sin duplicados, conservando el orden
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return Response({
+                'ids': ['At least one book id is required']
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.BOOKS_BATCH_MAX_IDS:
+            return Response({
+                'ids': [f'At most {settings.BOOKS_BATCH_MAX_IDS} ids per request']
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        selection = BookFieldsSerializer(data=request.query_params)
+        if not selection.is_valid():
+            return Response(selection.errors, status=status.HTTP_400_BAD_REQUEST)
+        fields = selection.validated_data['fields']
+
+        books = BookRepository().get_many(ids, fields=fields)
+        return Response({
+            'results': BookReadSerializer(
+                [books[pk] for pk in ids if pk in books], many=True, fields=fields
+            ).data,
+            'missing': [pk for pk in ids if pk not in books],
+        })
+
+class BookChangesView(APIView):
+    """Cambios desde un token de sincronización, para que los clientes no descarguen todo el catálogo."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        limit = BookCursorPagination().get_page_size(request)
+        try:
+            changes = changes_since(request.query_params.get('since'), limit)
+        except InvalidSyncToken:
+            return Response({'since': ['Invalid sync token']}, status=status.HTTP_400_BAD_REQUEST)
+        except SyncTokenExpired:
+            return Response({
+                'message': 'Sync token expired, a full sync is required'
+            }, status=status.HTTP_410_GONE)
+
+        next_link = None
+        if changes['has_more']:
+            next_link = replace_query_param(request.build_absolute_uri(), 'since', changes['sync_token'])
+        return Response({
+            'updated': BookReadSerializer(changes['updated'], many=True).data,
+            'deleted': [
+                {'id': tombstone['id'], 'deleted_at': tombstone['deleted_at']}
+                for tombstone in changes['deleted']
+            ],
+            'sync_token': changes['sync_token'],
+            'next': next_link,
+        })
+
+@method_decorator(gzip_page, name='dispatch')
+class BookExportView(APIView):
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request):
+        filters = BookFilterSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        renderer = request.accepted_renderer
+        fields = filters.validated_data['fields']
+        cursor = find_books_for_export(books_mongo_query(filters.validated_data), fields=fields)
+        if renderer.format == 'csv':
+            content = stream_csv(cursor, fields=fields)
+        else:
+            content = stream_ndjson(cursor, fields=fields)
+
+        response = StreamingHttpResponse(
+            content, content_type=f'{renderer.media_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="books.{renderer.format}"'
+        return response
+
 class BookDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -84,27 +263,83 @@ class BookDetailView(APIView):
         except Book.DoesNotExist:
             return None
 
+    def get_payload(self, pk, cache):
+        """(representación completa, updated_at) del libro, de la caché de lectura si está al día."""
+        version, payload = cache.get(pk)
+        if payload is not None:
+            return payload
+        book = BookRepository().get(pk)
+        if book is None:
+            return None
+        payload = (BookReadSerializer(book).data, book.get('updated_at'))
+        if version is not None:
+            cache.set(pk, version, payload)
+        return payload
+
     def get(self, request, pk):
-        book = self.get_object(pk)
+        selection = BookFieldsSerializer(data=request.query_params)
+        if not selection.is_valid():
+            return Response(selection.errors, status=status.HTTP_400_BAD_REQUEST)
+        fields = selection.validated_data['fields']
+
+        cache = get_book_cache()
+        # Solo ids numéricos: son los que invalidan las señales y el endpoint bulk
+        if cache.enabled and str(pk).isdigit():
+            return self.get_cached(request, int(pk), fields, cache)
+
+        # updated_at siempre se lee para el ETag aunque no se devuelva
+        book = BookRepository().get(pk, fields=fields and [*fields, 'updated_at'])
         if book is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
-        serializer = BookSerializer(book)
-        return Response(serializer.data)
+        etag, last_modified = book_validators(request, book['id'], book.get('updated_at'), fields)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        return set_validators(
+            Response(BookReadSerializer(book, fields=fields).data), etag, last_modified
+        )
+
+    def get_cached(self, request, pk, fields, cache):
+        # La caché guarda el libro completo: ?fields= se aplica sobre el payload
+        payload = self.get_payload(pk, cache)
+        if payload is None:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        data, updated_at = payload
+        etag, last_modified = book_validators(request, data['id'], updated_at, fields)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        # El payload cacheado se comparte entre peticiones: cada respuesta usa su propia copia
+        data = {field: data[field] for field in fields} if fields else dict(data)
+        return set_validators(Response(data), etag, last_modified)
 
     def put(self, request, pk):
         book = self.get_object(pk)
         if book is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        # If-Match / If-Unmodified-Since: 412 si el libro cambió desde que el cliente lo leyó
+        precondition_failed = evaluate_preconditions(
+            request, *book_validators(request, book.pk, book.updated_at)
+        )
+        if precondition_failed is not None:
+            return precondition_failed
         serializer = BookSerializer(book, data=request.data)
         if serializer.is_valid():
             serializer.save()
-            return Response(serializer.data)
+            return set_validators(
+                Response(serializer.data), *book_validators(request, book.pk, book.updated_at)
+            )
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, pk):
         book = self.get_object(pk)
         if book is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
+        precondition_failed = evaluate_preconditions(
+            request, *book_validators(request, book.pk, book.updated_at)
+        )
+        if precondition_failed is not None:
+            return precondition_failed
         book.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -112,33 +347,105 @@ class BookYearStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, year):
-        start_date = datetime(year, 1, 1)
-        end_date = datetime(year + 1, 1, 1)
-        
-        books = Book.objects.filter(
-            published_date__gte=start_date,
-            published_date__lt=end_date
-        )
-        
-        if not books.exists():
+        if request.query_params.get('check') == 'true':
+            repository = BookRepository()
+            stats = repository.year_stats(year)
+            computed = repository.computed_year_stats(year)
+            return Response({
+                'year': year,
+                'consistent': year_stats_match(stats, computed),
+                'materialized': stats,
+                'computed': computed
+            })
+
+        etag, last_modified = collection_validators(request)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        snapshot = get_snapshot(last_modified)
+        if snapshot is not None:
+            stats = snapshot.year_stats(year)
+        else:
+            stats = BookRepository().year_stats(year)
+        if stats is None:
             return Response({
                 'message': f'No books found for year {year}'
             }, status=status.HTTP_404_NOT_FOUND)
-        
-        total_books = books.count()
-        prices = [book.price for book in books]
-        
-        return Response({
-            'year': year,
-            'average_price': round(sum(prices) / len(prices), 2),
-            'minimum_price': min(prices),
-            'maximum_price': max(prices),
-            'total_books': total_books
-        })
+        return set_snapshot_validators(Response(stats), snapshot, etag, last_modified)
+
+class BookYearRangeStatsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            start_year = int(request.query_params['from'])
+            end_year = int(request.query_params['to'])
+        except (KeyError, ValueError):
+            return Response({
+                'message': 'Query parameters "from" and "to" must be valid years'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not 1 <= start_year <= end_year <= 9998:
+            return Response({
+                'message': 'Invalid year range: "from" must be less than or equal to "to"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, last_modified = collection_validators(request)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        return set_validators(Response({
+            'from': start_year,
+            'to': end_year,
+            'years': BookRepository().year_range_stats(start_year, end_year)
+        }), etag, last_modified)
+
+class BookFacetStatsView(APIView):
+    """Estadísticas por género, autor y década en una sola consulta, con los filtros del listado."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        filters = BookFacetStatsSerializer(data=request.query_params)
+        if not filters.is_valid():
+            return Response(filters.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, last_modified = collection_validators(request)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        stats = BookRepository().facet_stats(filters.validated_data, filters.validated_data['limit'])
+        return set_validators(Response(stats), etag, last_modified)
+
+class BookPriceDistributionView(APIView):
+    """Percentiles e histograma de precios, opcionalmente de un año, género o autor."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        params = PriceDistributionSerializer(data=request.query_params)
+        if not params.is_valid():
+            return Response(params.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        etag, last_modified = collection_validators(request)
+        not_modified = evaluate_preconditions(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        # Con la instantánea columnar activada se calcula en memoria con NumPy
+        snapshot = get_snapshot(last_modified)
+        source = snapshot if snapshot is not None else BookRepository()
+        distribution = source.price_distribution(**params.validated_data)
+        if distribution is None:
+            return Response({
+                'message': 'No books found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        return set_snapshot_validators(Response(distribution), snapshot, etag, last_modified)
 
 class UserProfileView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def get(self, request):
         user = request.user
@@ -151,10 +458,63 @@ class UserProfileView(APIView):
 
 class LogoutView(APIView):
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
 
     def post(self, request):
-        # Eliminar el token del usuario
+        # Eliminar el token del usuario; la señal post_delete lo saca de la caché
         Token.objects.filter(user=request.user).delete()
         return Response({'message': 'Successfully logged out'}, 
-                      status=status.HTTP_200_OK)
\ No newline at end of file
+                      status=status.HTTP_200_OK)
+
+class MongoPoolStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(MongoDBConnection.get_instance().get_pool_stats())
+
+class AuthCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_token_cache().stats())
+
+class BookCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_book_cache().stats())
+
+class MetricsView(APIView):
+    """Métricas de las peticiones en formato Prometheus, sumadas entre workers con BOOKS_METRICS_DIR."""
+    authentication_classes = [MetricsTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    permission_classes = [IsMetricsScraper | IsAdminUser]
+    renderer_classes = [PrometheusRenderer]
+
+    def get(self, request):
+        return Response(
+            metrics.registry.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+class OpenAPISchemaView(APIView):
+    """Esquema OpenAPI precalculado (ver books/utils/openapi.py), usado como SPEC_URL de /swagger/ y /redoc/."""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def get(self, request, version=None):
+        current = openapi.code_version()
+        if version != current:
+            # La URL versionada nunca cambia de contenido y puede cachearse sin límite
+            response = HttpResponseRedirect(reverse('openapi-schema-version', args=[current]))
+            patch_cache_control(response, no_cache=True)
+            return response
+
+        content, etag = openapi.get_schema()
+        not_modified = evaluate_preconditions(request, etag, None)
+        if not_modified is None:
+            response = HttpResponse(content, content_type='application/json')
+            set_validators(response, etag, None)
+        else:
+            response = not_modified
+        patch_cache_control(response, public=True, max_age=openapi.MAX_AGE, immutable=True)
+        return response
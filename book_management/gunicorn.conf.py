@@ -0,0 +1,35 @@
+import os
+import shutil
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+
+# Cada worker escribe aquí sus métricas y /metrics suma las de todos; uno por puerto si hay varias instancias
+os.environ.setdefault(
+    "BOOKS_METRICS_DIR",
+    os.path.join(tempfile.gettempdir(), f"books-metrics-{os.getenv('PORT', '8000')}"),
+)
+
+if os.getenv("BOOKS_ASYNC_VIEWS", "False") == "True":
+    # Un event loop por worker atiende muchas conexiones lentas a la vez
+    wsgi_app = "book_management.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "book_management.wsgi:application"
+    worker_class = "gthread"
+    threads = int(os.getenv("GUNICORN_THREADS", "8"))
+
+
+def post_fork(server, worker):
+    # Cada worker crea su propio MongoClient; el heredado del master no es seguro tras fork
+    from books.utils.mongo_connection import MongoDBConnection
+
+    MongoDBConnection.reset()
+
+
+def on_starting(server):
+    # Las métricas del arranque anterior no se suman: Prometheus ve un reinicio normal de los contadores
+    directory = os.environ["BOOKS_METRICS_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)